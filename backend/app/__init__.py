@@ -1,17 +1,31 @@
-from flask import Flask
-from flask_cors import CORS
-from dotenv import load_dotenv
 import os
 
+from dotenv import load_dotenv
+
 load_dotenv()
 
-def create_app():
+def create_app(warm=None):
+    """
+    Build the Flask app. Flask and the pipeline are imported here rather
+    than with the package, so scripts using app.* modules don't load
+    them; a prefork server that creates the app before forking
+    (gunicorn --preload) imports them once for all workers. warm
+    defaults to WARM_START and runs pipeline.warm_up.
+    """
+    from flask import Flask
+    from flask_cors import CORS
+
     app = Flask(__name__)
     frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
     print("Allowing CORS for frontend URL:", frontend_url)
-    CORS(app, resources={r"/*": {"origins": frontend_url}})
+    CORS(app, resources={r"/*": {"origins": frontend_url}}, expose_headers=["X-Request-ID", "X-Cache", "Server-Timing"])
     
     from .routes import main
     app.register_blueprint(main)
+
+    from .config import Config
+    if Config.WARM_START if warm is None else warm:
+        from .pipeline import warm_up
+        warm_up()
     
     return app
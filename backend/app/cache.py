@@ -0,0 +1,138 @@
+import hashlib
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+from .config import Config
+
+def cache_key(data, *params):
+    """Content hash of the uploaded bytes plus everything that shapes the result."""
+    digest = hashlib.sha256()
+    digest.update(repr(params).encode())
+    digest.update(b'\0')
+    digest.update(data)
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    Two-tier cache of finished request artifacts (name -> bytes).
+
+    The in-process tier is an LRU bounded by the total artifact size. The
+    optional disk tier keeps one uncompressed ZIP per key, shared by all
+    workers, and evicts the least recently used files once it grows past
+    max_disk_bytes. Disk hits are promoted to memory.
+    """
+
+    def __init__(self, max_bytes=64 << 20, directory=None, max_disk_bytes=512 << 20):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            artifacts = self._entries.get(key)
+            if artifacts is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return artifacts
+
+        artifacts = self._read_disk(key) if self.directory else None
+        with self._lock:
+            if artifacts is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._put_memory(key, artifacts)
+        return artifacts
+
+    def put(self, key, artifacts):
+        with self._lock:
+            self._put_memory(key, artifacts)
+        if self.directory:
+            self._write_disk(key, artifacts)
+            self._evict_disk()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
+
+    def _put_memory(self, key, artifacts):
+        size = sum(len(data) for data in artifacts.values())
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= sum(len(data) for data in old.values())
+        self._entries[key] = artifacts
+        self._size += size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= sum(len(data) for data in evicted.values())
+            self.evictions += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, f"{key}.zip")
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with zipfile.ZipFile(path) as zf:
+                artifacts = {name: zf.read(name) for name in zf.namelist()}
+            os.utime(path)
+            return artifacts
+        except (FileNotFoundError, zipfile.BadZipFile):
+            return None
+
+    def _write_disk(self, key, artifacts):
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as zf:
+            for name, data in artifacts.items():
+                zf.writestr(name, data)
+        os.replace(tmp_path, path)
+
+    def _evict_disk(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.zip'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            else:
+                with self._lock:
+                    self.disk_evictions += 1
+            total -= size
+
+def create_result_cache():
+    return ResultCache(Config.RESULT_CACHE_BYTES, Config.RESULT_CACHE_DIR, Config.RESULT_CACHE_DIR_BYTES)
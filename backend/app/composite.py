@@ -0,0 +1,71 @@
+import numpy as np
+import cv2 as cv
+
+BLACK = (0, 0, 0)
+
+class Composite:
+    """
+    Draw primitives of one output image, batched by kind and colour.
+
+    Consecutive primitives of the same kind and colour form a layer that
+    is rendered with a single OpenCV call: one cv.drawContours for
+    contours and one cv.polylines for line segments. Layers are drawn in
+    the order they were added, so later layers paint over earlier ones
+    and the image is the same as drawing every primitive on its own in
+    that order. Circles are drawn one cv.circle each, as polylines can't
+    reproduce their pixels. Every call only touches the pixels along its
+    primitives, so no full-image mask, copy or region crop is needed.
+    """
+
+    def __init__(self):
+        self.layers = []
+
+    def _layer(self, kind, color):
+        key = (kind, tuple(color))
+        if not self.layers or self.layers[-1][0] != key:
+            self.layers.append((key, []))
+        return self.layers[-1][1]
+
+    def contours(self, contours, color):
+        self._layer('contours', color).extend(contours)
+
+    def erase(self, contours):
+        """Clear the pixels along these contours, as a mask drawn with them would."""
+        self.contours(contours, BLACK)
+
+    def lines(self, segments, color):
+        """segments is a sequence of (start, end) points."""
+        self._layer('lines', color).extend(segments)
+
+    def circles(self, circles, color):
+        """circles is a sequence of (center, radius) pairs."""
+        self._layer('circles', color).extend(circles)
+
+    def render(self, img):
+        for (kind, color), items in self.layers:
+            if not items:
+                continue
+            if kind == 'contours':
+                cv.drawContours(img, items, -1, color, 1)
+            elif kind == 'lines':
+                segments = np.asarray(items, dtype=np.int32).reshape(-1, 2, 2)
+                cv.polylines(img, segments, isClosed=False, color=color, thickness=1)
+            else:
+                for center, radius in items:
+                    cv.circle(img, center, radius, color, 1)
+        return img
+
+    def render_each(self, img):
+        """
+        Draw every primitive with its own OpenCV call, in order, as the
+        pipeline did before batching; render must match it pixel for pixel.
+        """
+        for (kind, color), items in self.layers:
+            for item in items:
+                if kind == 'contours':
+                    cv.drawContours(img, [item], -1, color, 1)
+                elif kind == 'lines':
+                    cv.line(img, tuple(item[0]), tuple(item[1]), color, 1)
+                else:
+                    cv.circle(img, item[0], item[1], color, 1)
+        return img
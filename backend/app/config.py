@@ -1,4 +1,79 @@
 import os
 
+# Default home of the files the server writes: the Flask instance folder of
+# the app package (backend/instance), whatever the working directory
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance")
+
 class Config:
     PORT = int(os.getenv("PORT", 5000))
+    # When set, each request writes its artifacts to <dir>/<request id>/
+    DEBUG_DUMP_DIR = os.getenv("DEBUG_DUMP_DIR")
+
+    # Storage for the input/output images: "firebase" or "local"
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firebase")
+    LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", os.path.join(INSTANCE_DIR, "storage"))
+    FIREBASE_CREDENTIALS = os.getenv("FIREBASE_CREDENTIALS", "./privateKey.json")
+    FIREBASE_BUCKET = os.getenv("FIREBASE_BUCKET", "adobe-gensolve.appspot.com")
+    UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", 2))
+    UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", 64))
+    UPLOAD_RETRIES = int(os.getenv("UPLOAD_RETRIES", 3))
+
+    # Result cache for /upload-csv: in-memory LRU size and optional disk tier
+    RESULT_CACHE_BYTES = int(os.getenv("RESULT_CACHE_BYTES", 64 << 20))
+    RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR")
+    RESULT_CACHE_DIR_BYTES = int(os.getenv("RESULT_CACHE_DIR_BYTES", 512 << 20))
+
+    # Stream /upload-csv ZIPs as chunked responses instead of buffering them
+    STREAM_ZIP = os.getenv("STREAM_ZIP", "1") == "1"
+
+    # Pixel budget for the raster canvas fitted to each drawing
+    MAX_CANVAS_PIXELS = int(os.getenv("MAX_CANVAS_PIXELS", 2048 * 2048))
+
+    # PNG encoding of the images: zlib level (negative keeps OpenCV's fast
+    # default), row filter, and 1-bit output for the binary input canvas
+    PNG_COMPRESSION = int(os.getenv("PNG_COMPRESSION", -1))
+    PNG_FILTER = os.getenv("PNG_FILTER", "none")
+    PNG_BILEVEL = os.getenv("PNG_BILEVEL", "1") == "1"
+
+    # Canvases of at least this many pixels have their contours found and
+    # classified tile by tile on CONTOUR_WORKERS threads (0: one per CPU);
+    # off with a single worker or a threshold of 0
+    CONTOUR_TILE_PIXELS = int(os.getenv("CONTOUR_TILE_PIXELS", 4096 * 4096))
+    CONTOUR_WORKERS = int(os.getenv("CONTOUR_WORKERS", 0))
+
+    # "extended" also names lines, stars, ellipses and rounded rectangles
+    # among the contours the basic vertex-count classifier leaves unidentified;
+    # "templates" names every contour after its nearest shape in the library
+    # at SHAPE_LIBRARY, which is built there on first use and memory-mapped
+    SHAPE_CLASSIFIER = os.getenv("SHAPE_CLASSIFIER", "basic")
+    SHAPE_LIBRARY = os.getenv("SHAPE_LIBRARY", os.path.join(INSTANCE_DIR, "shape_library.npy"))
+
+    # Decimals kept in output.csv (negative keeps full precision) and whether
+    # to drop repeated and collinear consecutive points
+    CSV_PRECISION = int(os.getenv("CSV_PRECISION", 3))
+    CSV_SIMPLIFY = os.getenv("CSV_SIMPLIFY", "0") == "1"
+
+    # Live drawing sessions kept per worker, dropped after this many idle seconds
+    SESSION_LIMIT = int(os.getenv("SESSION_LIMIT", 64))
+    SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", 900))
+
+    # Default /upload-csv engine: "raster" fits shapes to image contours,
+    # "vector" fits them to the input points (override per request with ?engine=)
+    ENGINE = os.getenv("ENGINE", "raster")
+
+    # When set, every request is profiled into <dir>/<request id>.prof
+    # (cProfile) or .html (PROFILER=pyinstrument, which must be installed)
+    PROFILE_DIR = os.getenv("PROFILE_DIR")
+    PROFILER = os.getenv("PROFILER", "cprofile")
+
+    # Run a small drawing through the pipeline when the app is created, so
+    # workers forked after gunicorn --preload start warm
+    WARM_START = os.getenv("WARM_START", "1") == "1"
+
+    # /jobs: SQLite file shared by the workers of a host, pool processes
+    # and queued-or-running jobs per worker (429 beyond), and how long
+    # finished jobs are kept
+    JOB_DB = os.getenv("JOB_DB", os.path.join(INSTANCE_DIR, "jobs.sqlite3"))
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 16))
+    JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 3600))
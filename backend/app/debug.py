@@ -0,0 +1,18 @@
+import os
+from .config import Config
+
+def dump_artifacts(request_id, artifacts, dump_dir=None):
+    """
+    Write a request's artifacts (name -> bytes) to <dump_dir>/<request_id>/.
+    Does nothing unless a dump directory is passed or DEBUG_DUMP_DIR is set.
+    """
+    dump_dir = dump_dir or Config.DEBUG_DUMP_DIR
+    if not dump_dir:
+        return None
+
+    request_dir = os.path.join(dump_dir, request_id)
+    os.makedirs(request_dir, exist_ok=True)
+    for name, data in artifacts.items():
+        with open(os.path.join(request_dir, name), 'wb') as f:
+            f.write(data)
+    return request_dir
@@ -0,0 +1,54 @@
+import cv2 as cv
+
+from .config import Config
+from .metrics import StageClock, record_size
+
+# Row filters OpenCV can apply before deflate. The drawings are thin
+# lines on black, where filtering only adds work: 'none' encodes faster
+# and smaller than OpenCV's default 'sub'.
+PNG_FILTERS = {
+    'none': cv.IMWRITE_PNG_FILTER_NONE,
+    'sub': cv.IMWRITE_PNG_FILTER_SUB,
+    'up': cv.IMWRITE_PNG_FILTER_UP,
+    'avg': cv.IMWRITE_PNG_FILTER_AVG,
+    'paeth': cv.IMWRITE_PNG_FILTER_PAETH,
+}
+
+def png_params(compression=None, png_filter=None, bilevel=False):
+    """
+    cv.imencode parameters. compression None or negative keeps OpenCV's
+    default, zlib level 1 with run-length matching, the cheapest setting
+    for these images; 0-9 picks a zlib level with the default strategy
+    (9 is smallest and several times slower). bilevel writes 1-bit
+    grayscale and is only correct for single-channel 0/255 images.
+    """
+    params = []
+    if compression is not None and compression >= 0:
+        params += [cv.IMWRITE_PNG_COMPRESSION, int(compression)]
+    if png_filter is not None:
+        if png_filter not in PNG_FILTERS:
+            raise ValueError(f"Unknown PNG filter: {png_filter}")
+        params += [cv.IMWRITE_PNG_FILTER, PNG_FILTERS[png_filter]]
+    if bilevel:
+        params += [cv.IMWRITE_PNG_BILEVEL, 1]
+    return params
+
+def encode_png(img, stage, binary=False):
+    """
+    Encode img as PNG with the configured settings and record the time
+    and encoded size as stage. Returns a memoryview of OpenCV's output
+    buffer: the cache, ZIP writer, uploader and debug dump all accept it,
+    so the encoded image is never copied into a bytes object. binary
+    marks a single-channel 0/255 image, which PNG_BILEVEL writes at one
+    bit per pixel.
+    """
+    clock = StageClock()
+    params = png_params(Config.PNG_COMPRESSION, Config.PNG_FILTER,
+                        binary and img.ndim == 2 and Config.PNG_BILEVEL)
+    ok, encoded = cv.imencode('.png', img, params)
+    if not ok:
+        raise ValueError("Failed to encode PNG")
+    view = memoryview(encoded.reshape(-1))
+    clock.lap(stage)
+    record_size(stage, len(view))
+    return view
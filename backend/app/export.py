@@ -0,0 +1,62 @@
+import numpy as np
+
+# Decimals kept in output CSVs; None or a negative value keeps full precision
+CSV_PRECISION = 3
+
+def simplify_polyline(points, tolerance=0.0):
+    """
+    Drop repeated consecutive points, then interior points that lie within
+    tolerance of the chord between their neighbours while continuing in the
+    same direction. Each point is tested against its original neighbours,
+    so with tolerance 0 only exactly collinear points go. The endpoints are
+    always kept.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 2:
+        return points
+
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+    points = points[keep]
+    if len(points) < 3:
+        return points
+
+    before = points[1:-1] - points[:-2]
+    after = points[2:] - points[1:-1]
+    cross = before[:, 0] * after[:, 1] - before[:, 1] * after[:, 0]
+    chord = np.hypot(*(points[2:] - points[:-2]).T)
+    forward = np.einsum('ij,ij->i', before, after) > 0
+    straight = forward & (np.abs(cross) <= tolerance * chord)
+
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:-1] = ~straight
+    return points[keep]
+
+def format_polylines(polylines, precision=CSV_PRECISION, simplify=False, tolerance=0.0):
+    """
+    Serialize a list of (n, 2) point arrays as "index,0,x,y" CSV rows.
+
+    Coordinates are rounded to precision decimals and written in their
+    shortest round-trip form, so 41.0 stays "41.0" rather than "41.000".
+    All rows are formatted by a single string operation over one flat
+    array instead of a Python loop per point.
+    """
+    runs = []
+    for polyline in polylines:
+        points = np.asarray(polyline, dtype=np.float64).reshape(-1, 2)
+        if precision is not None and precision >= 0:
+            # Adding 0.0 turns the -0.0 that rounding can produce into 0.0
+            points = np.round(points, precision) + 0.0
+        if simplify:
+            points = simplify_polyline(points, tolerance)
+        runs.append(points)
+
+    if not runs:
+        return b''
+    ids = np.repeat(np.arange(len(runs), dtype=np.float64), [len(run) for run in runs])
+    rows = np.column_stack((ids, np.concatenate(runs)))
+    return (("%d,0,%r,%r\n" * len(rows)) % tuple(rows.ravel().tolist())).encode()
+
+def write_polylines(path, polylines, precision=CSV_PRECISION, simplify=False, tolerance=0.0):
+    with open(path, 'wb') as f:
+        f.write(format_polylines(polylines, precision, simplify, tolerance))
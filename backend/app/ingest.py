@@ -0,0 +1,83 @@
+import os
+from io import BytesIO
+
+import numpy as np
+
+# Accepted upload formats:
+#   .csv  four comma-separated columns: path id, shape id, x, y
+#   .npy  NumPy array of shape (n, 4)
+#   .f32  little-endian uint32 row count followed by n * 4 float32 values
+SUPPORTED_EXTENSIONS = ('.csv', '.npy', '.f32')
+COLUMNS = 4
+
+# CSVs up to this size are parsed with np.loadtxt, which skips importing
+# pandas; larger ones go through pandas' C parser, which is faster at volume
+LOADTXT_MAX_BYTES = 256 * 1024
+
+class IngestError(ValueError):
+    pass
+
+def _extension(filename):
+    return os.path.splitext(filename)[1].lower()
+
+def parse_polylines(data, filename="upload.csv"):
+    """
+    Parse uploaded bytes into a contiguous (n, 4) float array of finite
+    values. The format is chosen by file extension; see parse_csv for CSVs.
+    """
+    extension = _extension(filename)
+    if extension == '.npy':
+        try:
+            points = np.load(BytesIO(data), allow_pickle=False)
+        except (EOFError, OSError, TypeError, ValueError) as e:
+            # An empty or truncated file raises EOFError, a mangled header any of the others
+            raise IngestError(f"Invalid .npy file: {e or type(e).__name__}")
+    elif extension == '.f32':
+        points = _parse_f32(data)
+    elif extension == '.csv':
+        points = parse_csv(data)
+    else:
+        raise IngestError(f"Unsupported file type: {extension or filename}")
+
+    if points.ndim != 2 or points.shape[1] != COLUMNS or len(points) == 0:
+        raise IngestError(f"Expected a non-empty table with {COLUMNS} columns, got shape {points.shape}")
+    if not np.issubdtype(points.dtype, np.number) or np.issubdtype(points.dtype, np.complexfloating):
+        raise IngestError(f"Expected numeric coordinates, got dtype {points.dtype}")
+    if not np.issubdtype(points.dtype, np.floating):
+        points = points.astype(np.float64)
+    # NaN and inf can't be rasterized or fitted; reject them here rather than deep in the pipeline
+    finite = np.isfinite(points).all(axis=1)
+    if not finite.all():
+        raise IngestError(f"Non-finite value in row {np.flatnonzero(~finite)[0] + 1}")
+    return np.ascontiguousarray(points)
+
+def parse_csv(data, loadtxt_max_bytes=LOADTXT_MAX_BYTES):
+    """Parse CSV bytes into a float64 array, with np.loadtxt or pandas depending on their size."""
+    try:
+        if len(data) <= loadtxt_max_bytes:
+            return np.loadtxt(BytesIO(data), delimiter=',', dtype=np.float64, ndmin=2)
+        import pandas as pd
+
+        # Without the NA filter a missing field fails to parse, as it does in loadtxt
+        frame = pd.read_csv(BytesIO(data), header=None, dtype=np.float64, engine='c', na_filter=False)
+        return frame.to_numpy(np.float64)
+    except ValueError as e:
+        raise IngestError(f"Invalid CSV file: {e}")
+
+def _parse_f32(data):
+    if len(data) < 4:
+        raise IngestError("Truncated .f32 file: missing row count")
+    rows = int(np.frombuffer(data, dtype='<u4', count=1)[0])
+    expected = 4 + rows * COLUMNS * 4
+    if len(data) != expected:
+        raise IngestError(f".f32 header says {rows} rows ({expected} bytes) but the file has {len(data)} bytes")
+    return np.frombuffer(data, dtype='<f4', offset=4).reshape(rows, COLUMNS)
+
+def encode_f32(points):
+    """Encode an (n, 4) array in the length-prefixed .f32 format."""
+    points = np.asarray(points, dtype='<f4').reshape(-1, COLUMNS)
+    return np.uint32(len(points)).astype('<u4').tobytes() + points.tobytes()
+
+def read_polylines(path):
+    with open(path, 'rb') as f:
+        return parse_polylines(f.read(), path)
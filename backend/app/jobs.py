@@ -0,0 +1,209 @@
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+
+from .config import Config
+from .worker import init_worker, run_job
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    owner INTEGER NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (job_id, name)
+);
+"""
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobStore:
+    """
+    Job states and finished artifacts in one SQLite file, so every worker
+    process of a host can answer polls for jobs any of them accepted.
+    Each call opens its own connection; WAL lets readers run alongside
+    the single writer. The file, and its directory, are created on first
+    use.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._ready = False
+
+    def _connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA foreign_keys=ON")
+        if not self._ready:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            self._ready = True
+        return db
+
+    def _write(self, sql, params=()):
+        with closing(self._connect()) as db, db:
+            db.execute(sql, params)
+
+    def create(self, job_id, engine, filename):
+        self._write("INSERT INTO jobs (id, status, engine, filename, owner, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, engine, filename, os.getpid(), time.time()))
+
+    def mark_running(self, job_id):
+        self._write("UPDATE jobs SET status = ?, started = ? WHERE id = ?", (RUNNING, time.time(), job_id))
+
+    def finish(self, job_id, artifacts):
+        with closing(self._connect()) as db, db:
+            db.executemany("INSERT OR REPLACE INTO artifacts (job_id, name, data) VALUES (?, ?, ?)",
+                           [(job_id, name, data) for name, data in artifacts.items()])
+            db.execute("UPDATE jobs SET status = ?, finished = ? WHERE id = ?", (DONE, time.time(), job_id))
+
+    def fail(self, job_id, error):
+        self._write("UPDATE jobs SET status = ?, finished = ?, error = ? WHERE id = ?",
+                    (FAILED, time.time(), error, job_id))
+
+    def get(self, job_id):
+        """The job's row as a dict, or None. Unfinished jobs of a process that has exited are reported failed."""
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job['status'] in (QUEUED, RUNNING) and not _alive(job['owner']):
+            job['status'], job['error'] = FAILED, "The worker that accepted this job has exited"
+        return job
+
+    def artifacts(self, job_id):
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT name, data FROM artifacts WHERE job_id = ? ORDER BY rowid", (job_id,)).fetchall()
+        return {row['name']: bytes(row['data']) for row in rows}
+
+    def purge(self, before):
+        """Drop finished jobs and their artifacts that finished before this timestamp."""
+        self._write("DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?", (DONE, FAILED, before))
+
+class JobQueue:
+    """
+    Processes uploads on a pool of worker processes, off the request
+    threads. At most maxsize jobs are queued or running per process;
+    submit raises queue.Full beyond that so the caller can answer 429.
+    The pool uses spawned processes, which don't inherit the server's
+    threads or locks, and is started on first use in each process since
+    it can't survive a fork. Its processes run app.worker, which loads
+    the pipeline without building the app. Finished jobs are kept for
+    ttl seconds.
+    """
+
+    def __init__(self, store, workers=2, maxsize=16, ttl=3600):
+        self.store = store
+        self.workers = workers
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._pending = 0
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pid != os.getpid():
+            # Jobs of the parent's pool don't belong to a forked child
+            self._pool = None
+            self._pending = 0
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=init_worker)
+            self._pid = os.getpid()
+        return self._pool
+
+    def pending(self):
+        with self._lock:
+            return self._pending if self._pid == os.getpid() else 0
+
+    def submit(self, data, filename, engine, on_done=None):
+        """
+        Queue one upload and return its job id. on_done(job_id, artifacts)
+        runs in this process once the job has succeeded.
+        """
+        with self._lock:
+            pool = self._get_pool()
+            if self._pending >= self.maxsize:
+                self.rejected += 1
+                raise queue.Full
+            self._pending += 1
+
+        self.store.purge(time.time() - self.ttl)
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.create(job_id, engine, filename)
+            future = pool.submit(run_job, self.store.path, job_id, data, filename, engine)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(lambda future: self._finished(job_id, future, on_done, pool))
+        return job_id
+
+    def add_finished(self, artifacts, filename, engine):
+        """Record a job whose artifacts are already known, e.g. from the result cache."""
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, engine, filename)
+        self.store.finish(job_id, artifacts)
+        return job_id
+
+    def _finished(self, job_id, future, on_done, pool):
+        with self._lock:
+            self._pending -= 1
+        try:
+            artifacts = future.result()
+        except BrokenProcessPool:
+            # A worker died; the pool can't take new work, so start a fresh one next time
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+                self.failed += 1
+            self.store.fail(job_id, "The job's worker process exited unexpectedly")
+            return
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            self.store.fail(job_id, str(e) or type(e).__name__)
+            return
+
+        self.store.finish(job_id, artifacts)
+        with self._lock:
+            self.completed += 1
+        if on_done is not None:
+            on_done(job_id, artifacts)
+
+def create_job_queue():
+    return JobQueue(JobStore(Config.JOB_DB), Config.JOB_WORKERS, Config.JOB_QUEUE_SIZE, Config.JOB_TTL_SECONDS)
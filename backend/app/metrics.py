@@ -0,0 +1,238 @@
+import bisect
+import contextvars
+import os
+import sys
+import threading
+import time
+
+from .config import Config
+
+# Upper bounds of the stage and request duration histograms, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+class RequestTimings:
+    """
+    Wall time and allocated memory blocks of each stage of one request,
+    in the order the stages first ran, and the bytes produced by stages
+    such as the image encodes. A stage that runs more than once is summed.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.sizes = {}
+
+    def add(self, name, seconds, blocks):
+        total_seconds, total_blocks = self.stages.get(name, (0.0, 0))
+        self.stages[name] = (total_seconds + seconds, total_blocks + blocks)
+
+    def add_size(self, name, nbytes):
+        self.sizes[name] = self.sizes.get(name, 0) + nbytes
+
+    def server_timing(self, total=None):
+        """Server-Timing header value, durations in milliseconds and sizes as descriptions."""
+        entries = []
+        for name, (seconds, _) in self.stages.items():
+            entry = f"{name};dur={seconds * 1000:.2f}"
+            if name in self.sizes:
+                entry += f';desc="{self.sizes[name]} bytes"'
+            entries.append(entry)
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        # Buckets are upper bounds, inclusive as Prometheus' le
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+class Metrics:
+    """
+    In-process stage and request histograms in Prometheus text format.
+
+    Each worker process keeps its own, so with several gunicorn workers
+    every scrape sees one worker's share of the traffic.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._stages = {}
+        self._blocks = {}
+        self._sizes = {}
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def observe_stage(self, name, seconds, blocks=0):
+        with self._lock:
+            self._stages.setdefault(name, Histogram(self.buckets)).observe(seconds)
+            total, count = self._blocks.get(name, (0, 0))
+            self._blocks[name] = (total + blocks, count + 1)
+
+    def observe_size(self, name, nbytes):
+        with self._lock:
+            total, count = self._sizes.get(name, (0, 0))
+            self._sizes[name] = (total + nbytes, count + 1)
+
+    def observe_request(self, endpoint, seconds):
+        with self._lock:
+            self._requests.setdefault(endpoint, Histogram(self.buckets)).observe(seconds)
+
+    def clear(self):
+        with self._lock:
+            self._stages.clear()
+            self._blocks.clear()
+            self._sizes.clear()
+            self._requests.clear()
+
+    def render(self, gauges=None, counters=None):
+        """
+        Prometheus text exposition of every histogram, plus gauges and
+        counters, dicts of metric name -> value: gauges for instantaneous
+        values such as queue depth, counters for running totals such as
+        cache hits. Counter names get a _total suffix.
+        """
+        lines = []
+        with self._lock:
+            self._render_histograms(lines, 'gensolve_stage_seconds', 'stage', self._stages,
+                                    'Wall time of each pipeline stage.')
+            self._render_histograms(lines, 'gensolve_request_seconds', 'endpoint', self._requests,
+                                    'Wall time of each request.')
+            lines.append('# HELP gensolve_stage_allocated_blocks Net Python memory blocks allocated by each stage.')
+            lines.append('# TYPE gensolve_stage_allocated_blocks summary')
+            for name, (total, count) in sorted(self._blocks.items()):
+                lines.append(f'gensolve_stage_allocated_blocks_sum{{stage="{name}"}} {total}')
+                lines.append(f'gensolve_stage_allocated_blocks_count{{stage="{name}"}} {count}')
+            lines.append('# HELP gensolve_stage_output_bytes Bytes produced by each stage, such as encoded images.')
+            lines.append('# TYPE gensolve_stage_output_bytes summary')
+            for name, (total, count) in sorted(self._sizes.items()):
+                lines.append(f'gensolve_stage_output_bytes_sum{{stage="{name}"}} {total}')
+                lines.append(f'gensolve_stage_output_bytes_count{{stage="{name}"}} {count}')
+        for name, value in (gauges or {}).items():
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        for name, value in (counters or {}).items():
+            lines.append(f'# TYPE {name}_total counter')
+            lines.append(f'{name}_total {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _render_histograms(self, lines, metric, label, histograms, help_text):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for name, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{metric}_bucket{{{label}="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.sum}')
+            lines.append(f'{metric}_count{{{label}="{name}"}} {cumulative}')
+
+metrics = Metrics()
+
+def record_stage(name, seconds, blocks=0):
+    """Add one stage run to the process histograms and to the current request, if any."""
+    metrics.observe_stage(name, seconds, blocks)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds, blocks)
+
+def record_size(name, nbytes):
+    """Add the output size of one stage run to the process metrics and to the current request, if any."""
+    metrics.observe_size(name, nbytes)
+    timings = _current.get()
+    if timings is not None:
+        timings.add_size(name, nbytes)
+
+class StageClock:
+    """
+    Times consecutive pipeline stages: lap(name) records everything since
+    the previous lap, or since the clock was made, as stage name.
+    Allocations are the net change of sys.getallocatedblocks, so they
+    count Python objects, not NumPy or OpenCV buffers.
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._blocks = sys.getallocatedblocks()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        blocks = sys.getallocatedblocks()
+        record_stage(name, now - self._start, blocks - self._blocks)
+        self._start = now
+        self._blocks = blocks
+
+def timed_chunks(name, chunks):
+    """
+    Yield from chunks, timing the whole iteration as one stage. Meant for
+    streamed response bodies, which run after the headers are sent, so
+    only the process histograms see them.
+    """
+    start = time.perf_counter()
+    try:
+        yield from chunks
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+def start_request():
+    """Collect the stages of the current request; returns its RequestTimings and a token for end_request."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+def end_request(token):
+    _current.reset(token)
+
+class RequestProfiler:
+    """
+    Profiles whole requests and writes one file per request id into
+    directory: <id>.prof for cProfile (open with pstats or snakeviz) or
+    <id>.html for pyinstrument. cProfile only sees the thread it was
+    started on, which is the request's own.
+    """
+
+    def __init__(self, directory, kind='cprofile'):
+        if kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {kind}")
+        if kind == 'pyinstrument':
+            import pyinstrument  # noqa: F401 -- fail at startup, not on the first request
+        self.directory = directory
+        self.kind = kind
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        if self.kind == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode='disabled')
+            profiler.start()
+            return profiler
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler, request_id):
+        if self.kind == 'pyinstrument':
+            profiler.stop()
+            path = os.path.join(self.directory, f"{request_id}.html")
+            with open(path, 'w') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            path = os.path.join(self.directory, f"{request_id}.prof")
+            profiler.dump_stats(path)
+        return path
+
+def create_profiler():
+    """RequestProfiler for PROFILE_DIR, or None when profiling is off."""
+    if not Config.PROFILE_DIR:
+        return None
+    return RequestProfiler(Config.PROFILE_DIR, Config.PROFILER)
@@ -0,0 +1,232 @@
+import os
+from io import BytesIO
+
+import numpy as np
+import cv2 as cv
+
+from .composite import Composite
+from .config import Config
+from .encode import encode_png
+from .export import format_polylines
+from .ingest import parse_polylines
+from .metrics import StageClock, metrics
+from .polylines import shapes_to_polylines
+from .rasterize import MAX_CANVAS_PIXELS, fit_canvas, rasterize_polylines
+from .shapes import CLASSIFIERS, SHAPE_COLORS
+from .symmetry import detect_symmetry
+from .tiles import classify_tiled, find_contours_tiled, use_tiles
+from .vector import ENGINES, draw_shapes, regularize_polylines
+
+shape_classifier = CLASSIFIERS[Config.SHAPE_CLASSIFIER]()
+
+def image_to_svg(img, contours_to_draw, circle_info, bounding_box, linesToDraw, filename="output.svg"):
+    import svgwrite
+
+    height, width = img.shape[:2]
+    dwg = svgwrite.Drawing(filename, profile='full', size=(width, height))
+    
+    for contour, color in contours_to_draw:
+        points = contour[:, 0, :].tolist()
+        path_data = f"M {points[0][0]},{points[0][1]} " + " ".join([f"L {p[0]},{p[1]}" for p in points[1:]])
+        path_data += " Z"
+        path = dwg.path(d=path_data, stroke=svgwrite.rgb(*color, '%'), fill="none", stroke_width=1)
+        dwg.add(path)
+    
+    for center, radius in circle_info:
+        dwg.add(dwg.circle(center=center, r=radius, stroke=svgwrite.rgb(0, 0, 255, '%'), fill="none", stroke_width=1))
+    
+    for box in bounding_box:
+        points = box.tolist()
+        for i in range(4):
+            x1, y1 = points[i]
+            x2, y2 = points[(i + 1) % 4]
+            dwg.add(dwg.line((x1, y1), (x2, y2), stroke=svgwrite.rgb(255, 0, 0, '%'), stroke_width=1))
+
+    for line in linesToDraw:
+        dwg.add(dwg.line((int(a) for a in line[0]), (int(a) for a in line[1]), stroke=svgwrite.rgb(0, 255, 0, '%'), stroke_width=1))
+
+    dwg.save()
+
+def compose_shapes(shapes):
+    """
+    Composite of the raster output image for classified shapes, with the
+    unidentified and recognized outlines, circles, boxes and lines that
+    output.csv and the SVG are built from. The primitives are added in the
+    order they used to be drawn one call at a time, so rendering the
+    batches gives the same pixels.
+    """
+    circleInfo = []
+    boundingBox = []
+    contoursToDraw = []
+    finalContours = []
+    linesToDraw = []
+    erased = []
+
+    for shape in shapes:
+        if shape.label == "rectangle":
+            rect = cv.minAreaRect(shape.contour)
+            box = cv.boxPoints(rect)
+            box = box.astype(int)
+            boundingBox.append(box)
+            erased.append(shape.contour)
+        elif shape.label == "circle":
+            circleInfo.append((shape.center, shape.radius))
+            erased.append(shape.contour)
+        elif shape.label in SHAPE_COLORS:
+            erased.append(shape.contour)
+            contoursToDraw.append((shape.approx, SHAPE_COLORS[shape.label]))
+        else:
+            finalContours.append((shape.contour, (255, 255, 0)))
+
+    # Unidentified outlines are drawn before the recognized ones are erased,
+    # so pixels the two share end up cleared
+    composite = Composite()
+    composite.contours([contour for contour, _ in finalContours], (255, 255, 0))
+    composite.erase(erased)
+
+    for center, radius in circleInfo:
+        lines = [[(int(center[0] - radius), int(center[1])), (int(center[0] + radius), int(center[1]))],
+                 [(int(center[0]), int(center[1] - radius)), (int(center[0]), int(center[1] + radius))]]
+        composite.circles([(center, max(radius - 5, 0))], (0, 0, 255))
+        composite.lines(lines, (0, 255, 0))
+        linesToDraw.extend(lines)
+
+    for box in boundingBox:
+        p1_h = tuple(box[1])
+        p2_h = tuple(box[3])
+        mid1 = tuple(((box[0] + box[1]) // 2).astype(int))
+        mid2 = tuple(((box[1] + box[2]) // 2).astype(int))
+        mid3 = tuple(((box[2] + box[3]) // 2).astype(int))
+        mid4 = tuple(((box[3] + box[0]) // 2).astype(int))
+        lines = [[p1_h, p2_h], [mid1, mid3], [mid2, mid4]]
+        composite.contours([box], (255, 0, 0))
+        composite.lines(lines, (0, 255, 0))
+        linesToDraw.extend(lines)
+
+    for approx, color in contoursToDraw:
+        composite.contours([approx], color)
+    finalContours.extend(contoursToDraw)
+    return composite, finalContours, contoursToDraw, circleInfo, boundingBox, linesToDraw
+
+def process_csv_and_generate_image(polylines, input_csv=None, svg_path=None, max_canvas_pixels=MAX_CANVAS_PIXELS, engine='raster'):
+    """
+    Process the CSV file to generate an image.
+    Returns the input PNG, input CSV, output PNG and output CSV; the PNGs
+    are memoryviews of the encoder's buffers (see encode_png).
+    polylines is an (n, 4) array or DataFrame; input_csv, when given, is
+    returned as-is instead of re-serializing the rows.
+    The canvas is fitted to the drawing's bounding box within
+    max_canvas_pixels; output.csv is mapped back to input coordinates,
+    while the images and the optional SVG at svg_path stay in canvas pixels.
+    engine 'vector' fits shapes on the input points instead of the
+    rasterized contours; it writes no SVG.
+    Each stage's time is recorded in the process metrics and, during a
+    request, in its Server-Timing header.
+    """
+    clock = StageClock()
+    transform = fit_canvas(polylines, max_canvas_pixels)
+    img = rasterize_polylines(polylines, transform)
+    clock.lap('rasterize')
+
+    if input_csv is None:
+        import pandas as pd
+
+        input_csv_df = pd.DataFrame(polylines)
+        input_csv_buffer = BytesIO()
+        input_csv_df.to_csv(input_csv_buffer, index=False, header=False)
+        input_csv = input_csv_buffer.getvalue()
+        clock.lap('input_csv')
+
+    input_png = encode_png(img, 'input_png', binary=True)
+    clock = StageClock()
+
+    if engine == 'vector':
+        shapes = regularize_polylines(polylines)
+        clock.lap('fit')
+        output_img = draw_shapes(shapes, transform)
+        clock.lap('draw')
+        output_png = encode_png(output_img, 'output_png')
+        clock = StageClock()
+        output_polylines = [polyline for shape in shapes for polyline in shape.polylines()]
+        csv_bytes = format_polylines(output_polylines, Config.CSV_PRECISION, Config.CSV_SIMPLIFY)
+        clock.lap('output_csv')
+        return input_png, input_csv, output_png, csv_bytes
+
+    blur = cv.blur(img, (1, 1))
+    _, binary = cv.threshold(blur, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+    clock.lap('threshold')
+
+    img = cv.cvtColor(img, cv.COLOR_GRAY2RGB)
+    # Large canvases are split into tiles on a thread pool; the result is the same
+    tiled = use_tiles(binary.shape)
+    if tiled:
+        contours, hierarchy = find_contours_tiled(binary)
+    else:
+        contours, hierarchy = cv.findContours(binary, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+    clock.lap('contours')
+
+    shapes = classify_tiled(shape_classifier, contours) if tiled else shape_classifier.classify(contours)
+    clock.lap('classify')
+
+    composite, finalContours, contoursToDraw, circleInfo, boundingBox, linesToDraw = compose_shapes(shapes)
+
+    axes = []
+    for axis in detect_symmetry([contour[0] for contour in contoursToDraw]):
+        p1 = tuple(int(v) for v in np.rint(axis.start))
+        p2 = tuple(int(v) for v in np.rint(axis.end))
+        axes.append([p1, p2])
+    linesToDraw.extend(axes)
+    clock.lap('symmetry')
+
+    composite.lines(axes, (0, 255, 0))
+    composite.render(img)
+    clock.lap('draw')
+
+    output_png = encode_png(img, 'output_png')
+    clock = StageClock()
+    
+    output_polylines = shapes_to_polylines(finalContours, circleInfo, boundingBox, linesToDraw)
+    output_polylines = [transform.to_drawing(polyline) for polyline in output_polylines]
+
+    if svg_path is not None:
+        image_to_svg(img, finalContours, circleInfo, boundingBox, linesToDraw, filename=svg_path)
+        clock.lap('svg')
+
+    csv_bytes = format_polylines(output_polylines, Config.CSV_PRECISION, Config.CSV_SIMPLIFY)
+    clock.lap('output_csv')
+
+    return input_png, input_csv, output_png, csv_bytes
+
+def process_upload(data, filename, engine='raster'):
+    """Artifacts (name -> bytes-like) of one uploaded drawing, as /upload-csv returns them."""
+    clock = StageClock()
+    polylines = parse_polylines(data, filename)
+    clock.lap('parse')
+
+    # A CSV upload is its own input.csv; binary uploads get one written
+    extension = os.path.splitext(filename)[1].lower()
+    input_png, input_csv, output_png, csv_bytes = process_csv_and_generate_image(
+        polylines, input_csv=data if extension == '.csv' else None,
+        max_canvas_pixels=Config.MAX_CANVAS_PIXELS, engine=engine)
+    return {
+        'input_image.png': input_png,
+        'input.csv': input_csv,
+        'output_image.png': output_png,
+        'output.csv': csv_bytes,
+    }
+
+def warm_up():
+    """
+    Run a small drawing through both engines, so the lazy imports and
+    the first-call setup of OpenCV, NumPy and SciPy happen now rather
+    than in the first request. The stage timings it leaves behind are
+    cleared.
+    """
+    t = np.linspace(0, 2 * np.pi, 64)
+    circle = np.column_stack((50 + 30 * np.cos(t), 50 + 30 * np.sin(t)))
+    triangle = np.array([[120, 20], [180, 20], [150, 72], [120, 20]], dtype=np.float64)
+    drawing = np.vstack([np.column_stack((np.full(len(points), i), np.zeros(len(points)), points))
+                         for i, points in enumerate((circle, triangle))])
+    for engine in ENGINES:
+        process_csv_and_generate_image(drawing, input_csv=b'', engine=engine)
+    metrics.clear()
@@ -0,0 +1,83 @@
+import numpy as np
+
+# Upper bound on points per curved segment (the old fixed sample count)
+# and the default maximum distance, in pixels, between a curve and the
+# chords that approximate it.
+ARC_SAMPLES = 100
+CHORD_TOLERANCE = 0.25
+
+def arc_sample_count(radius, sweep, tolerance=CHORD_TOLERANCE):
+    """
+    Points needed for chords to stay within tolerance of an arc of the
+    given radius and sweep angle in degrees.
+    """
+    if radius <= tolerance:
+        return 2
+    step = 2 * np.degrees(np.arccos(1 - tolerance / radius))
+    return int(np.clip(np.ceil(abs(sweep) / step) + 1, 2, ARC_SAMPLES))
+
+def sample_arc(center, rx, ry, theta, delta, rotation=1, samples=None, tolerance=CHORD_TOLERANCE):
+    """
+    Evaluate an elliptical arc at evenly spaced parameters in one NumPy
+    expression. theta and delta are in degrees and rotation is the unit
+    complex number of the ellipse's x-axis, as in svgpathtools.Arc.
+    """
+    if samples is None:
+        samples = arc_sample_count(max(rx, ry), delta, tolerance)
+    t = np.linspace(0, 1, num=samples)
+    # Same degree-based parameterisation as svgpathtools.Arc.point
+    angle = (theta + t * delta) * np.pi / 180
+    cosphi, sinphi = rotation.real, rotation.imag
+    x = rx * cosphi * np.cos(angle) - ry * sinphi * np.sin(angle) + center.real
+    y = rx * sinphi * np.cos(angle) + ry * cosphi * np.sin(angle) + center.imag
+    return np.column_stack([x, y])
+
+def contour_polyline(contour):
+    """
+    Points of a closed contour as the SVG route produced them: each line
+    segment contributes its start and end point, and the closing segment
+    is only present when the last point differs from the first.
+    """
+    points = np.asarray(contour, dtype=np.float64).reshape(-1, 2)
+    if len(points) > 1 and (points[-1] != points[0]).any():
+        points = np.vstack([points, points[:1]])
+    return np.stack([points[:-1], points[1:]], axis=1).reshape(-1, 2)
+
+def line_polyline(start, end):
+    return np.array([start, end], dtype=np.float64).reshape(2, 2)
+
+def circle_polyline(center, radius, tolerance=CHORD_TOLERANCE):
+    """
+    Sample a circle as two half arcs, matching the path svgpathtools
+    builds for an SVG <circle>: from the leftmost point through the
+    bottom to the rightmost point, then back through the top.
+    """
+    cx, cy = float(center[0]), float(center[1])
+    left = np.array([[cx - radius, cy]])
+    right = np.array([[cx + radius, cy]])
+
+    halves = []
+    for start, theta, end in ((left, 180, right), (right, 0, left)):
+        arc = sample_arc(complex(cx, cy), radius, radius, theta, -180, tolerance=tolerance)
+        halves.extend([start, arc, end])
+    return np.vstack(halves)
+
+def shapes_to_polylines(contours_to_draw, circle_info, bounding_box, lines_to_draw):
+    """
+    Build the output polylines straight from the detected shapes, in the
+    order the SVG written by image_to_svg used to be read back in:
+    contour paths, then box edges and other lines, then circles.
+    """
+    polylines = [contour_polyline(contour) for contour, _ in contours_to_draw]
+
+    for box in bounding_box:
+        for i in range(4):
+            polylines.append(line_polyline(box[i], box[(i + 1) % 4]))
+
+    for start, end in lines_to_draw:
+        polylines.append(line_polyline([int(a) for a in start], [int(a) for a in end]))
+
+    for center, radius in circle_info:
+        polylines.append(circle_polyline(center, radius))
+
+    return polylines
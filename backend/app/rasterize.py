@@ -0,0 +1,96 @@
+import numpy as np
+import cv2 as cv
+
+CANVAS_SIZE = (512, 512)
+CANVAS_MARGIN = 2
+MAX_CANVAS_PIXELS = 2048 * 2048
+
+class CanvasTransform:
+    """
+    Maps drawing coordinates onto a raster canvas and back:
+    pixel = coordinate * scale - offset.
+    """
+
+    def __init__(self, scale, offset, shape):
+        self.scale = float(scale)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.shape = tuple(int(n) for n in shape)
+
+    @classmethod
+    def identity(cls, shape=CANVAS_SIZE):
+        return cls(1.0, (0, 0), shape)
+
+    @classmethod
+    def fit(cls, points, max_pixels=MAX_CANVAS_PIXELS, margin=CANVAS_MARGIN):
+        """
+        Size the canvas to the bounding box of the points plus a margin,
+        at scale 1 when it fits in max_pixels and scaled down otherwise.
+        Offsets are even whole pixels so that at scale 1 rasterization is
+        the same as drawing at the original coordinates.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        points = points[np.isfinite(points).all(axis=1)]
+        if len(points) == 0:
+            return cls.identity()
+
+        lo = points.min(axis=0)
+        hi = points.max(axis=0)
+        width, height = hi - lo
+        pad = 2 * margin + 2
+
+        scale = 1.0
+        if (width + pad) * (height + pad) > max_pixels:
+            # Largest scale with (width*s + pad) * (height*s + pad) <= max_pixels
+            a = width * height
+            b = pad * (width + height)
+            c = pad * pad - max_pixels
+            scale = -c / b if a == 0 else (-b + np.sqrt(b * b - 4 * a * c)) / (2 * a)
+
+        # np.rint rounds halves to even, so only even offsets keep it
+        # shift-invariant: rint(x - k) == rint(x) - k for even k.
+        offset = 2 * np.floor((np.floor(lo * scale) - margin) / 2)
+        far = np.ceil(hi * scale) - offset + margin + 1
+        return cls(scale, offset, (far[1], far[0]))
+
+    def to_canvas(self, points):
+        return np.asarray(points, dtype=np.float64) * self.scale - self.offset
+
+    def to_drawing(self, points):
+        return (np.asarray(points, dtype=np.float64) + self.offset) / self.scale
+
+def fit_canvas(polylines, max_pixels=MAX_CANVAS_PIXELS):
+    """CanvasTransform fitted to the x/y columns of four-column polyline rows."""
+    data = np.asarray(polylines, dtype=np.float64)
+    return CanvasTransform.fit(data[:, 2:4] if data.ndim == 2 else [], max_pixels)
+
+def group_polylines(polylines, transform=None):
+    """
+    Split four-column (path id, shape id, x, y) rows into polylines.
+    A new polyline starts whenever the (path id, shape id) pair differs
+    from the previous row. Returns a list of int32 point arrays that are
+    views into one contiguous array of rounded canvas coordinates.
+    """
+    data = np.asarray(polylines, dtype=np.float64)
+    if len(data) == 0:
+        return []
+
+    keys = data[:, :2]
+    starts = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+    coords = data[:, 2:4] if transform is None else transform.to_canvas(data[:, 2:4])
+    points = np.rint(coords).astype(np.int32)
+
+    # Single-point runs never produced a segment in the row-by-row loop.
+    return [run for run in np.split(points, starts) if len(run) > 1]
+
+def rasterize_polylines(polylines, transform=None):
+    """
+    Draw every polyline onto a black single-channel canvas with one
+    batched cv.polylines call. Without a transform the coordinates are
+    used as pixels on a fixed 512x512 canvas.
+    """
+    transform = transform or CanvasTransform.identity()
+    img = np.zeros(transform.shape, dtype=np.uint8)
+    runs = group_polylines(polylines, transform)
+    if runs:
+        cv.polylines(img, runs, isClosed=False, color=255, thickness=1)
+    return img
@@ -1,59 +1,329 @@
-from flask import Blueprint, request, jsonify, send_file
-import pandas as pd
-import matplotlib.pyplot as plt
-import io
+import logging
+import os
+import queue
+import time
+import uuid
+import zipfile
+from io import BytesIO
+
+import numpy as np
+from flask import Blueprint, Response, g, request, jsonify, send_file
+
+from .cache import cache_key, create_result_cache
+from .config import Config
+from .debug import dump_artifacts
+from .ingest import SUPPORTED_EXTENSIONS, IngestError
+from .metrics import StageClock, create_profiler, end_request, metrics, start_request, timed_chunks
+from .jobs import DONE, create_job_queue
+from .pipeline import process_upload, shape_classifier
+from .sessions import SessionError, create_session_store
+from .storage import create_upload_queue
+from .vector import ENGINES
+from .zipstream import compression_for, stream_zip
+
+logger = logging.getLogger(__name__)
 
-# Create a Blueprint instance
 main = Blueprint('main', __name__)
 
-# Route to upload CSV and generate image
-@main.route('/upload-csv', methods=['POST'])
-def upload_csv():
+# PROFILE_DIR turns on a profile dump per request id
+profiler = create_profiler()
+
+@main.before_app_request
+def start_timing():
+    g.request_id = uuid.uuid4().hex
+    g.request_start = time.perf_counter()
+    g.timings, g.timings_token = start_request()
+    g.profile = profiler.start() if profiler is not None else None
+
+@main.after_app_request
+def add_server_timing(response):
+    total = time.perf_counter() - g.request_start
+    metrics.observe_request(request.endpoint or 'unknown', total)
+    response.headers['Server-Timing'] = g.timings.server_timing(total)
+    return response
+
+@main.teardown_app_request
+def end_timing(exc):
+    if g.get('profile') is not None:
+        profiler.stop(g.profile, g.request_id)
+    if g.get('timings_token') is not None:
+        end_request(g.timings_token)
+
+# Images are uploaded in the background; STORAGE_BACKEND selects Firebase or a local directory
+upload_queue = create_upload_queue()
+
+def image_key(request_id, name):
+    return f"images/{request_id}/{name}"
+
+# Finished artifacts keyed by the uploaded bytes; bump PIPELINE_VERSION
+# whenever a change to the pipeline alters its output.
+PIPELINE_VERSION = 6
+result_cache = create_result_cache()
+
+def read_upload():
+    """
+    The uploaded file, its extension and the requested engine, or an
+    error response for a missing file, unsupported type or unknown engine.
+    """
     if 'file' not in request.files:
-        return jsonify({'error': 'No file part'}), 400
+        return None, (jsonify({"error": "No file part in the request"}), 400)
 
     file = request.files['file']
+
     if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
+        return None, (jsonify({"error": "No selected file"}), 400)
+
+    extension = os.path.splitext(file.filename)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        return None, (jsonify({"error": f"File must be one of: {', '.join(SUPPORTED_EXTENSIONS)}"}), 400)
+
+    engine = request.values.get('engine', Config.ENGINE)
+    if engine not in ENGINES:
+        return None, (jsonify({"error": f"engine must be one of: {', '.join(ENGINES)}"}), 400)
+
+    return (file, extension, engine), None
+
+def upload_key(data, extension, engine):
+    return cache_key(data, PIPELINE_VERSION, extension, Config.MAX_CANVAS_PIXELS,
+                     Config.CSV_PRECISION, Config.CSV_SIMPLIFY, engine,
+                     Config.PNG_COMPRESSION, Config.PNG_FILTER, Config.PNG_BILEVEL,
+                     Config.SHAPE_CLASSIFIER, Config.SHAPE_LIBRARY)
+
+def publish_artifacts(request_id, artifacts):
+    dump_artifacts(request_id, artifacts)
+
+    # Queue the image uploads; the response doesn't wait for them
+    try:
+        upload_queue.submit(artifacts['input_image.png'], image_key(request_id, 'input_image.png'))
+        upload_queue.submit(artifacts['output_image.png'], image_key(request_id, 'output_image.png'))
+    except queue.Full:
+        logger.warning("Upload queue full, skipping image upload for request %s", request_id)
+
+def zip_response(artifacts):
+    if Config.STREAM_ZIP:
+        # Chunked response: the archive is generated while it is sent
+        response = Response(timed_chunks('zip', stream_zip(artifacts.items())), mimetype='application/zip')
+        response.headers['Content-Disposition'] = 'attachment; filename=output.zip'
+        return response
+
+    clock = StageClock()
+    zip_buffer = BytesIO()
+
+    with zipfile.ZipFile(zip_buffer, 'w') as zf:
+        for name, content in artifacts.items():
+            zf.writestr(name, content, compress_type=compression_for(name))
+
+    zip_buffer.seek(0)
+    clock.lap('zip')
+
+    return send_file(
+        zip_buffer,
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name='output.zip'
+    )
+
+@main.route('/upload-csv', methods=['POST'])
+def upload_csv():
+    upload, error = read_upload()
+    if error is not None:
+        return error
+    file, extension, engine = upload
+
+    request_id = g.request_id
+
+    try:
+        clock = StageClock()
+        data = file.read()
+        key = upload_key(data, extension, engine)
+        artifacts = result_cache.get(key)
+        cache_status = 'HIT' if artifacts is not None else 'MISS'
+        clock.lap('cache')
+
+        if artifacts is None:
+            artifacts = process_upload(data, file.filename, engine)
+            clock = StageClock()
+            result_cache.put(key, artifacts)
+            clock.lap('cache')
+
+        publish_artifacts(request_id, artifacts)
+
+        response = zip_response(artifacts)
+        response.headers['X-Request-ID'] = request_id
+        response.headers['X-Cache'] = cache_status
+        return response
+
+    except IngestError as e:
+        return jsonify({"error": str(e)}), 400
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Large drawings can be processed off the request threads: POST /jobs
+# answers at once and GET /jobs/<id>/result serves the ZIP once it's done
+jobs = create_job_queue()
+
+def job_json(job):
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "engine": job['engine'],
+        "filename": job['filename'],
+        "created": job['created'],
+        "started": job['started'],
+        "finished": job['finished'],
+        "error": job['error'],
+        "result": f"/jobs/{job['id']}/result" if job['status'] == DONE else None,
+    }
+
+@main.route('/jobs', methods=['POST'])
+def submit_job():
+    upload, error = read_upload()
+    if error is not None:
+        return error
+    file, extension, engine = upload
+
+    try:
+        data = file.read()
+        key = upload_key(data, extension, engine)
+        artifacts = result_cache.get(key)
+        if artifacts is not None:
+            job_id = jobs.add_finished(artifacts, file.filename, engine)
+            publish_artifacts(job_id, artifacts)
+        else:
+            def finished(job_id, artifacts):
+                result_cache.put(key, artifacts)
+                publish_artifacts(job_id, artifacts)
+
+            try:
+                job_id = jobs.submit(data, file.filename, engine, on_done=finished)
+            except queue.Full:
+                response = jsonify({"error": "Too many jobs in progress, try again shortly"})
+                response.headers['Retry-After'] = '1'
+                return response, 429
+
+        return jsonify(job_json(jobs.store.get(job_id))), 202, {'Location': f"/jobs/{job_id}"}
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@main.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job_json(job))
+
+@main.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = jobs.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job['status'] != DONE:
+        return jsonify(dict(job_json(job), error=job['error'] or f"Job is {job['status']}")), 409
+
+    response = zip_response(jobs.store.artifacts(job_id))
+    response.headers['X-Request-ID'] = job_id
+    return response
+
+@main.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+@main.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage and request histograms of this worker, in Prometheus text format."""
+    cache = result_cache.stats()
+    gauges = {
+        "gensolve_result_cache_entries": cache.pop('entries'),
+        "gensolve_result_cache_bytes": cache.pop('bytes'),
+        "gensolve_sessions": len(sessions),
+        "gensolve_jobs_pending": jobs.pending(),
+    }
+    counters = {f"gensolve_result_cache_{name}": value for name, value in cache.items()}
+    counters.update({
+        "gensolve_session_evictions": sessions.evictions,
+        "gensolve_uploads_done": upload_queue.uploaded,
+        "gensolve_uploads_failed": upload_queue.failed,
+        "gensolve_jobs_completed": jobs.completed,
+        "gensolve_jobs_failed": jobs.failed,
+        "gensolve_jobs_rejected": jobs.rejected,
+    })
+    return Response(metrics.render(gauges, counters), mimetype='text/plain; version=0.0.4')
+
+@main.route('/get-image-url', methods=['GET'])
+def get_image_url():
+    # The id upload_csv returned in X-Request-ID; ?request_id= for plain links
+    request_id = request.headers.get('X-Request-ID') or request.args.get('request_id', '')
+    if not request_id.isalnum():
+        return jsonify({"error": "Missing or invalid X-Request-ID"}), 400
+
+    try:
+        return jsonify({
+            "inputImageUrl": upload_queue.backend.url(image_key(request_id, 'input_image.png')),
+            "imageUrl": upload_queue.backend.url(image_key(request_id, 'output_image.png')),
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-    if file and allowed_file(file.filename):
-        try:
-            # Read CSV file into DataFrame
-            df = pd.read_csv(file)
+# Live drawing sessions hold their canvas in this process, so a deployment
+# with several workers needs requests for one session routed to one worker
+sessions = create_session_store(shape_classifier)
 
-            # Process the DataFrame and generate an image
-            img = process_csv_and_generate_image(df)
+def session_shape_json(shape):
+    precision = Config.CSV_PRECISION
+    polylines = shape.polylines if precision < 0 else [np.round(p, precision) + 0.0 for p in shape.polylines]
+    return {"id": shape.id, "label": shape.label, "polylines": [p.tolist() for p in polylines]}
 
-            # Create an in-memory file object for the image
-            img_io = io.BytesIO()
-            img.save(img_io, format='PNG')
-            img_io.seek(0)
+@main.route('/sessions', methods=['POST'])
+def create_session():
+    session_id, _ = sessions.create()
+    return jsonify({"session_id": session_id}), 201
 
-            # Send the image file as response
-            return send_file(img_io, mimetype='image/png', as_attachment=True, download_name='output.png')
+@main.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired session"}), 404
+    with session.lock:
+        shapes = [session_shape_json(shape) for shape in session.shapes.values()]
+        strokes = len(session.strokes)
+    return jsonify({"session_id": session_id, "strokes": strokes, "shapes": shapes})
 
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
+@main.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    if not sessions.delete(session_id):
+        return jsonify({"error": "Unknown or expired session"}), 404
+    return '', 204
 
-    return jsonify({'error': 'Invalid file type'}), 400
+@main.route('/sessions/<session_id>/strokes', methods=['POST'])
+def update_session(session_id):
+    """
+    Apply one edit: {"add": {stroke id: [[x, y], ...]}, "remove": [stroke id, ...]}.
+    A stroke id that already exists is replaced. The response only lists
+    the shapes that changed.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired session"}), 404
 
-# Helper function to check if file type is allowed
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'csv'}
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('add', {}), dict) \
+            or not isinstance(body.get('remove', []), list):
+        return jsonify({"error": "Expected a JSON object with an 'add' object and a 'remove' list"}), 400
 
-# Function to process CSV and generate image
-def process_csv_and_generate_image(df):
-    # Example processing: Create a bar plot from the DataFrame
-    plt.figure()
-    df.plot(kind='bar')
-    plt.title('CSV Data Plot')
-    plt.xlabel('Index')
-    plt.ylabel('Values')
+    try:
+        delta = session.update(body.get('add'), body.get('remove', []))
+    except SessionError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # Save plot to a BytesIO object
-    img = io.BytesIO()
-    plt.savefig(img, format='png')
-    plt.close()
-    img.seek(0)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-    return img
+    region = delta['region']
+    return jsonify({
+        "added": [session_shape_json(shape) for shape in delta['added']],
+        "removed": delta['removed'],
+        "region": None if region is None else region.tolist(),
+        "rebuilt": delta['rebuilt'],
+    })
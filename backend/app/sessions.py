@@ -0,0 +1,262 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import count
+
+import numpy as np
+import cv2 as cv
+
+from .config import Config
+from .rasterize import MAX_CANVAS_PIXELS, CanvasTransform
+from .polylines import shapes_to_polylines
+from .shapes import SHAPE_COLORS
+from .spatial import LiveShapeIndex
+from .symmetry import detect_symmetry
+
+# Room left around the strokes whenever the session canvas is refitted, so
+# drawing near the edge doesn't force a full rebuild on every edit
+CANVAS_SLACK = 128
+
+class SessionError(ValueError):
+    pass
+
+@dataclass
+class SessionShape:
+    id: int
+    label: str
+    box: np.ndarray
+    polylines: list
+
+def stroke_points(points):
+    """Validate one stroke as an (n, 2) array; points are [x, y] pairs or {"x", "y"} objects."""
+    if not isinstance(points, (list, tuple, np.ndarray)):
+        raise SessionError(f"Expected a list of [x, y] points, got {type(points).__name__}")
+    try:
+        if len(points) and isinstance(points[0], dict):
+            points = [(p.get('x'), p.get('y')) for p in points]
+        points = np.asarray(points, dtype=np.float64)
+    except (AttributeError, TypeError, ValueError):
+        raise SessionError("Stroke points must be numbers")
+    if points.ndim != 2 or points.shape[1] != 2 or not np.isfinite(points).all():
+        raise SessionError(f"Expected a list of [x, y] points, got shape {points.shape}")
+    return points
+
+def shape_polylines(shape, axes=()):
+    """
+    Output polylines of one classified shape in canvas pixels, built the
+    way process_csv_and_generate_image builds them for a whole drawing.
+    """
+    if shape.label == "rectangle":
+        box = cv.boxPoints(cv.minAreaRect(shape.contour)).astype(int)
+        mid1 = tuple((box[0] + box[1]) // 2)
+        mid2 = tuple((box[1] + box[2]) // 2)
+        mid3 = tuple((box[2] + box[3]) // 2)
+        mid4 = tuple((box[3] + box[0]) // 2)
+        return shapes_to_polylines([], [], [box], [(box[1], box[3]), (mid1, mid3), (mid2, mid4)])
+    if shape.label == "circle":
+        (x, y), radius = shape.center, shape.radius
+        lines = [((x - radius, y), (x + radius, y)), ((x, y - radius), (x, y + radius))]
+        return shapes_to_polylines([], [(shape.center, shape.radius)], [], lines)
+    if shape.label in SHAPE_COLORS:
+        lines = [(np.rint(axis.start), np.rint(axis.end)) for axis in axes]
+        return shapes_to_polylines([(shape.approx, SHAPE_COLORS[shape.label])], [], [], lines)
+    return shapes_to_polylines([(shape.contour, None)], [], [], [])
+
+def _union(boxes):
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    return np.concatenate((boxes[:, :2].min(axis=0), boxes[:, 2:].max(axis=0)))
+
+class DrawingSession:
+    """
+    Raster canvas, contours and classified shapes of one live drawing.
+
+    Strokes are added, replaced and removed by id. An edit only clears and
+    redraws the pixels under the changed strokes, then grows that region
+    until it covers every shape it touches, so findContours and the
+    classifier only see the connected strokes around the edit. The boxes
+    of the strokes and shapes are kept in LiveShapeIndex grids, so finding
+    what an edit touches doesn't scan the whole drawing. The canvas is
+    refitted, and everything recomputed, only when a stroke leaves it.
+    """
+
+    def __init__(self, classifier, max_pixels=MAX_CANVAS_PIXELS):
+        self.classifier = classifier
+        self.max_pixels = max_pixels
+        self.strokes = {}
+        self.shapes = {}
+        self.transform = None
+        self.img = None
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self._stroke_boxes = LiveShapeIndex()
+        self._shape_boxes = LiveShapeIndex()
+        self._shape_ids = count()
+
+    def update(self, add=None, remove=()):
+        """
+        Apply one edit and return what changed: new shapes, ids of the
+        shapes that went away, the recomputed region in drawing
+        coordinates and whether the whole canvas was rebuilt.
+        """
+        add = {str(key): stroke_points(points) for key, points in (add or {}).items()}
+        remove = [str(key) for key in remove]
+
+        with self.lock:
+            self.last_used = time.monotonic()
+            changed = [self._stroke_boxes.pop(key) for key in remove + list(add) if key in self._stroke_boxes]
+            for key in remove:
+                self.strokes.pop(key, None)
+            self.strokes.update(add)
+
+            if self.transform is None or not self._fits(add.values()):
+                return self._rebuild()
+
+            for key, points in add.items():
+                self._stroke_boxes.add(key, self._canvas_box(points))
+            changed.extend(self._stroke_boxes[key] for key in add)
+            if not changed:
+                return self._delta([], [], None)
+            return self._refresh(_union(changed))
+
+    def _canvas_box(self, points):
+        canvas = self.transform.to_canvas(points)
+        return np.concatenate((np.floor(canvas.min(axis=0)) - 1, np.ceil(canvas.max(axis=0)) + 1)).astype(np.int64)
+
+    def _fits(self, strokes):
+        height, width = self.transform.shape
+        for points in strokes:
+            box = self._canvas_box(points)
+            if box[0] < 0 or box[1] < 0 or box[2] >= width or box[3] >= height:
+                return False
+        return True
+
+    def _draw(self, keys):
+        runs = [np.rint(self.transform.to_canvas(self.strokes[key])).astype(np.int32) for key in keys]
+        runs = [run for run in runs if len(run) > 1]
+        if runs:
+            cv.polylines(self.img, runs, isClosed=False, color=255, thickness=1)
+
+    def _rebuild(self):
+        removed = list(self.shapes)
+        self.shapes.clear()
+        self._shape_boxes.clear()
+        self._stroke_boxes.clear()
+        if not self.strokes:
+            self.transform = self.img = None
+            return self._delta([], removed, None, rebuilt=True)
+
+        points = np.concatenate(list(self.strokes.values()))
+        lo, hi = points.min(axis=0), points.max(axis=0)
+        self.transform = CanvasTransform.fit([lo - CANVAS_SLACK, hi + CANVAS_SLACK], self.max_pixels)
+        self.img = np.zeros(self.transform.shape, dtype=np.uint8)
+        for key, stroke in self.strokes.items():
+            self._stroke_boxes.add(key, self._canvas_box(stroke))
+        self._draw(self.strokes)
+
+        height, width = self.img.shape
+        region = np.array([0, 0, width - 1, height - 1])
+        contours, _ = cv.findContours(self.img, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+        return self._delta(self._add_shapes(contours), removed, region, rebuilt=True)
+
+    def _refresh(self, region):
+        height, width = self.img.shape
+        region = np.clip(region, 0, [width - 1, height - 1, width - 1, height - 1])
+        x0, y0, x1, y1 = region
+        self.img[y0:y1 + 1, x0:x1 + 1] = 0
+        self._draw(self._stroke_boxes.query(region))
+
+        # Grow the region until no shape crosses its border, so the crop
+        # holds whole connected components and nothing outside changes
+        while True:
+            stale = self._shape_boxes.query(region)
+            grown = _union([region] + [self._shape_boxes[i] for i in stale])
+            if np.array_equal(grown, region):
+                break
+            region = grown
+
+        removed = sorted(stale)
+        for shape_id in removed:
+            del self.shapes[shape_id]
+            self._shape_boxes.pop(shape_id)
+
+        x0, y0, x1, y1 = region
+        crop = cv.copyMakeBorder(self.img[y0:y1 + 1, x0:x1 + 1], 1, 1, 1, 1, cv.BORDER_CONSTANT, value=0)
+        contours, _ = cv.findContours(crop, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE, offset=(int(x0) - 1, int(y0) - 1))
+        return self._delta(self._add_shapes(contours), removed, region)
+
+    def _add_shapes(self, contours):
+        classified = self.classifier.classify(contours)
+        polygons = [i for i, shape in enumerate(classified) if shape.label in SHAPE_COLORS]
+        axes = {}
+        for axis in detect_symmetry([classified[i].approx for i in polygons]):
+            axes.setdefault(polygons[axis.shape], []).append(axis)
+
+        added = []
+        for i, shape in enumerate(classified):
+            points = shape.contour.reshape(-1, 2)
+            box = np.concatenate((points.min(axis=0), points.max(axis=0)))
+            polylines = [self.transform.to_drawing(p) for p in shape_polylines(shape, axes.get(i, ()))]
+            session_shape = SessionShape(next(self._shape_ids), shape.label, box, polylines)
+            self.shapes[session_shape.id] = session_shape
+            self._shape_boxes.add(session_shape.id, box)
+            added.append(session_shape)
+        return added
+
+    def _delta(self, added, removed, region, rebuilt=False):
+        if region is not None:
+            region = np.concatenate(self.transform.to_drawing(np.reshape(region, (2, 2))))
+        return {'added': added, 'removed': removed, 'region': region, 'rebuilt': rebuilt}
+
+class SessionStore:
+    """
+    Live drawing sessions of this process by id. Sessions idle for longer
+    than idle_seconds are dropped, and the least recently used ones go
+    first once there are more than max_sessions.
+    """
+
+    def __init__(self, classifier, max_sessions=64, idle_seconds=900, max_pixels=MAX_CANVAS_PIXELS):
+        self.classifier = classifier
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.max_pixels = max_pixels
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self):
+        session_id = uuid.uuid4().hex
+        session = DrawingSession(self.classifier, self.max_pixels)
+        with self._lock:
+            self._sessions[session_id] = session
+            self._evict()
+        return session_id, session
+
+    def get(self, session_id):
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_used = time.monotonic()
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        for session_id in [key for key, session in self._sessions.items() if session.last_used < cutoff]:
+            del self._sessions[session_id]
+            self.evictions += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+def create_session_store(classifier):
+    return SessionStore(classifier, Config.SESSION_LIMIT, Config.SESSION_IDLE_SECONDS, Config.MAX_CANVAS_PIXELS)
@@ -0,0 +1,344 @@
+from dataclasses import dataclass
+
+import numpy as np
+import cv2 as cv
+
+from .config import Config
+from .templates import fourier_descriptors, load_library, nearest_templates
+
+UNIDENTIFIED = "unidentified"
+
+POLYGON_NAMES = {
+    3: "triangle",
+    4: "rectangle",
+    5: "pentagon",
+    6: "hexagon",
+    7: "heptagon",
+    8: "octagon",
+    9: "nonagon",
+    10: "decagon",
+}
+
+# Outline colour for shapes that are redrawn from their approximation.
+SHAPE_COLORS = {
+    "triangle": (0, 128, 0),
+    "pentagon": (128, 0, 128),
+    "hexagon": (0, 128, 128),
+    "heptagon": (255, 165, 0),
+    "octagon": (0, 165, 255),
+    "nonagon": (75, 0, 130),
+    "decagon": (102, 102, 102),
+    "ellipse": (0, 0, 255),
+    "star": (255, 0, 255),
+    "rounded_rectangle": (255, 0, 0),
+    "line": (255, 255, 255),
+}
+
+# Columns of the feature matrix ExtendedShapeClassifier computes per contour
+FEATURES = ("length", "width", "aspect", "solidity", "extent", "ellipse_error", "defects")
+LENGTH, WIDTH, ASPECT, SOLIDITY, EXTENT, ELLIPSE_ERROR, DEFECTS = range(len(FEATURES))
+# A convexity defect counts when it is deeper than this fraction of the
+# square root of the hull area
+DEFECT_DEPTH = 0.1
+
+# Labels for contours the vertex-count ladder leaves unidentified, as
+# inclusive (low, high) ranges of FEATURES; the first matching row wins.
+# length and width are the sides of the minimum-area rectangle in pixels,
+# aspect their ratio, extent the contour's share of that rectangle (pi/4
+# for an ellipse), and ellipse_error the mean relative distance of the
+# points from the ellipse with the contour's second moments.
+SHAPE_RULES = (
+    ("line", {"length": (10, np.inf), "aspect": (0, 0.1), "extent": (0, 0.3)}),
+    ("star", {"length": (10, np.inf), "solidity": (0.3, 0.8), "defects": (4, np.inf)}),
+    ("ellipse", {"length": (10, np.inf), "solidity": (0.9, 1), "aspect": (0, 0.85), "extent": (0, 0.82),
+                 "ellipse_error": (0, 0.033)}),
+    ("rounded_rectangle", {"length": (10, np.inf), "solidity": (0.94, 1), "extent": (0.84, 0.98)}),
+)
+
+@dataclass
+class ClassifiedShape:
+    label: str
+    contour: np.ndarray
+    approx: np.ndarray = None
+    center: tuple = None
+    radius: int = None
+
+@dataclass
+class ContourFeatures:
+    """
+    Per-contour measurements for one image, stored as parallel arrays.
+    center/radius are NaN where the enclosing circle was not needed and
+    approx is None for contours below the minimum area.
+    """
+    area: np.ndarray
+    perimeter: np.ndarray
+    is_round: np.ndarray
+    vertices: np.ndarray
+    approx: list
+    center: np.ndarray
+    radius: np.ndarray
+
+class ShapeClassifier:
+    """
+    Classifies all contours of an image in one pass.
+
+    Contours whose fine approximation (eps = 1% of the perimeter) has at
+    least `round_vertices` vertices are tested against their enclosing
+    circle; the rest are named from the vertex count of the coarse
+    approximation (eps = 2%).
+    """
+
+    def __init__(self, round_vertices=7, ten_vertex_label="circle", min_area=3):
+        self.round_vertices = round_vertices
+        self.ten_vertex_label = ten_vertex_label
+        self.min_area = min_area
+
+        names = [UNIDENTIFIED] * 12
+        for count, name in POLYGON_NAMES.items():
+            names[count] = name
+        names[10] = ten_vertex_label
+        self._names = np.array(names, dtype=object)
+
+    def measure(self, contours):
+        n = len(contours)
+        area = np.fromiter((cv.contourArea(c) for c in contours), dtype=np.float64, count=n)
+        perimeter = np.fromiter((cv.arcLength(c, True) for c in contours), dtype=np.float64, count=n)
+        is_round = np.zeros(n, dtype=bool)
+        vertices = np.zeros(n, dtype=np.int32)
+        approx = [None] * n
+        center = np.full((n, 2), np.nan)
+        radius = np.full(n, np.nan)
+
+        for i in np.flatnonzero(area >= self.min_area):
+            contour = contours[i]
+            poly = cv.approxPolyDP(contour, 0.01 * perimeter[i], True)
+            is_round[i] = len(poly) >= self.round_vertices
+            if not is_round[i]:
+                poly = cv.approxPolyDP(contour, 0.02 * perimeter[i], True)
+            approx[i] = poly
+            vertices[i] = len(poly)
+
+            if is_round[i] or (vertices[i] == 10 and self.ten_vertex_label == "circle"):
+                (x, y), r = cv.minEnclosingCircle(contour)
+                center[i] = x, y
+                radius[i] = r
+
+        return ContourFeatures(area, perimeter, is_round, vertices, approx, center, radius)
+
+    def labels(self, features):
+        valid = features.area >= self.min_area
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = features.perimeter / features.area
+        circle_area = np.pi * features.radius ** 2
+
+        labels = np.full(len(valid), UNIDENTIFIED, dtype=object)
+
+        round_ = valid & features.is_round
+        labels[round_ & (np.abs(features.area - circle_area) < 0.2 * circle_area)] = "circle"
+
+        polygon = valid & ~features.is_round
+        labels[polygon] = self._names[np.minimum(features.vertices[polygon], len(self._names) - 1)]
+        labels[polygon & (features.vertices == 7) & (ratio > 0.05)] = UNIDENTIFIED
+        labels[polygon & (features.vertices == 10) & (ratio > 0.105)] = UNIDENTIFIED
+        return labels
+
+    def classify(self, contours):
+        features = self.measure(contours)
+        return self.shapes(contours, features, self.labels(features))
+
+    def shapes(self, contours, features, labels):
+        shapes = []
+        for i, label in enumerate(labels):
+            contour = contours[i]
+            if label == "circle":
+                x, y = features.center[i]
+                shapes.append(ClassifiedShape(label, contour, center=(int(x), int(y)),
+                                              radius=int(features.radius[i])))
+            elif label != UNIDENTIFIED:
+                shapes.append(ClassifiedShape(label, contour, approx=features.approx[i]))
+            else:
+                shapes.append(ClassifiedShape(label, contour))
+        return shapes
+
+def _moment_ellipse_error(contours, moments):
+    """
+    Mean relative distance of each contour's points from the ellipse with
+    the contour's area centroid and second moments, which for an ellipse
+    is the ellipse itself. Computed over all points at once; inf where
+    the contour encloses no area.
+    """
+    m00, m10, m01, mu20, mu11, mu02 = moments.T
+    error = np.full(len(contours), np.inf)
+    valid = m00 > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a, b, c = mu20 / m00, mu11 / m00, mu02 / m00
+        spread = np.hypot((a - c) / 2, b)
+        # A filled ellipse with semi-axes p and q has variances p**2/4 and q**2/4
+        major = 2 * np.sqrt((a + c) / 2 + spread)
+        minor = 2 * np.sqrt(np.maximum((a + c) / 2 - spread, 0))
+        angle = np.arctan2(2 * b, a - c) / 2
+        valid &= minor > 0
+    index = np.flatnonzero(valid)
+    if len(index) == 0:
+        return error
+
+    counts = np.array([len(contours[i]) for i in index])
+    points = np.concatenate([contours[i].reshape(-1, 2) for i in index]).astype(np.float64)
+    owner = np.repeat(np.arange(len(index)), counts)
+    centers = np.column_stack((m10, m01))[index] / m00[index, None]
+    offset = points - centers[owner]
+    cos, sin = np.cos(angle[index])[owner], np.sin(angle[index])[owner]
+    u = (offset[:, 0] * cos + offset[:, 1] * sin) / major[index][owner]
+    v = (offset[:, 1] * cos - offset[:, 0] * sin) / minor[index][owner]
+    error[index] = np.bincount(owner, np.abs(np.hypot(u, v) - 1), len(index)) / counts
+    return error
+
+def shape_features(contours):
+    """
+    (n, len(FEATURES)) matrix of rotation invariant measurements. The
+    OpenCV measurements are taken in one pass over the contours and the
+    ellipse errors for all of them at once. Measurements a contour has
+    too few points for are inf, so no rule range accepts them.
+    """
+    matrix = np.full((len(contours), len(FEATURES)), np.inf)
+    moments = np.zeros((len(contours), 6))
+    matrix[:, DEFECTS] = 0
+    for i, contour in enumerate(contours):
+        m = cv.moments(contour)
+        moments[i] = m['m00'], m['m10'], m['m01'], m['mu20'], m['mu11'], m['mu02']
+        _, sides, _ = cv.minAreaRect(contour)
+        length, width = max(sides), min(sides)
+        hull = cv.convexHull(contour, returnPoints=False)
+        hull_area = cv.contourArea(contour[hull.ravel()])
+        area = m['m00']
+
+        row = matrix[i]
+        row[LENGTH], row[WIDTH] = length, width
+        if length > 0:
+            row[ASPECT] = width / length
+            # A straight run of pixels has a flat rectangle and no area
+            row[EXTENT] = area / (length * width) if width > 0 else 0
+        if hull_area > 0:
+            row[SOLIDITY] = area / hull_area
+        if len(contour) > 3 and hull_area > 0:
+            try:
+                defects = cv.convexityDefects(contour, hull)
+            except cv.error:
+                # Contours that touch themselves can have a non-monotonous hull
+                defects = None
+            if defects is not None:
+                # Depths are fixed-point with 8 fractional bits
+                depths = defects.reshape(-1, 4)[:, 3] / 256
+                row[DEFECTS] = np.count_nonzero(depths > DEFECT_DEPTH * np.sqrt(hull_area))
+    matrix[:, ELLIPSE_ERROR] = _moment_ellipse_error(contours, moments)
+    return matrix
+
+def match_rules(matrix, rules=SHAPE_RULES):
+    """Index into rules of the first row each feature row satisfies, or -1."""
+    low = np.full((len(rules), len(FEATURES)), -np.inf)
+    high = np.full((len(rules), len(FEATURES)), np.inf)
+    for r, (_, ranges) in enumerate(rules):
+        for name, (lo, hi) in ranges.items():
+            low[r, FEATURES.index(name)] = lo
+            high[r, FEATURES.index(name)] = hi
+    # A feature a row doesn't restrict matches even when it is inf
+    inside = (matrix[:, None, :] >= low) & ((matrix[:, None, :] <= high) | (high == np.inf))
+    matches = inside.all(axis=2)
+    return np.where(matches.any(axis=1), matches.argmax(axis=1), -1)
+
+def _outline(label, contour, approx):
+    """Approximation a shape named by a rule is redrawn from."""
+    if label == "line":
+        center, (width, height), angle = cv.minAreaRect(contour)
+        theta = np.radians(angle if width >= height else angle + 90)
+        half = max(width, height) / 2 * np.array([np.cos(theta), np.sin(theta)])
+        return np.rint([[center - half], [center + half]]).astype(np.int32)
+    if label == "ellipse":
+        (x, y), (width, height), angle = cv.fitEllipse(contour)
+        points = cv.ellipse2Poly((int(round(x)), int(round(y))), (int(round(width / 2)), int(round(height / 2))),
+                                 int(round(angle)), 0, 360, 5)
+        return points.reshape(-1, 1, 2)
+    if approx is None:
+        approx = cv.approxPolyDP(contour, 0.01 * cv.arcLength(contour, True), True)
+    return approx
+
+class ExtendedShapeClassifier(ShapeClassifier):
+    """
+    ShapeClassifier that also names lines, stars, ellipses and rounded
+    rectangles.
+
+    The contours the vertex-count ladder leaves unidentified, and the
+    10-vertex outlines it calls circles (which include five-pointed
+    stars), get one shape_features row each; match_rules then compares
+    the whole matrix against every row of `rules` at once, so adding a
+    shape is one more row rather than another branch. Ellipses are
+    redrawn from their fitted ellipse, lines from their end points, and
+    stars and rounded rectangles from their approximation.
+    """
+
+    def __init__(self, rules=SHAPE_RULES, **kwargs):
+        super().__init__(**kwargs)
+        self.rules = rules
+
+    def classify(self, contours):
+        features = self.measure(contours)
+        labels = self.labels(features)
+        shapes = self.shapes(contours, features, labels)
+
+        candidates = np.flatnonzero((labels == UNIDENTIFIED) | ((labels == "circle") & ~features.is_round))
+        matched = match_rules(shape_features([contours[i] for i in candidates]), self.rules)
+        for i, rule in zip(candidates[matched >= 0], matched[matched >= 0]):
+            label = self.rules[rule][0]
+            shapes[i] = ClassifiedShape(label, contours[i], approx=_outline(label, contours[i], features.approx[i]))
+        return shapes
+
+# Largest descriptor distance to the nearest template that still names a
+# contour, and the shortest perimeter in pixels worth naming; the
+# smallest contours are pixel-sized gaps between strokes
+TEMPLATE_DISTANCE = 0.065
+TEMPLATE_PERIMETER = 20
+
+class TemplateShapeClassifier:
+    """
+    Names each contour after the nearest shape in a template library.
+
+    The library (see templates.py) holds Fourier descriptors of rendered
+    template shapes; it is loaded, memory-mapped, when the classifier is
+    created. Descriptors of all contours of an image are computed in one
+    batch and matched against every template in one matrix product, so
+    there are no per-shape thresholds beyond the distance cut-off.
+    Contours farther than max_distance from every template, or shorter
+    than min_perimeter, are unidentified.
+    """
+
+    def __init__(self, library=None, max_distance=TEMPLATE_DISTANCE, min_perimeter=TEMPLATE_PERIMETER):
+        self.library = load_library(Config.SHAPE_LIBRARY) if library is None else library
+        self.max_distance = max_distance
+        self.min_perimeter = min_perimeter
+        self._names = np.append(np.asarray(self.library['label'], dtype=object), UNIDENTIFIED)
+
+    def classify(self, contours):
+        index, distance = nearest_templates(fourier_descriptors(contours), self.library)
+        perimeter = np.fromiter((cv.arcLength(c, True) for c in contours), dtype=np.float64, count=len(contours))
+        named = (distance <= self.max_distance) & (perimeter >= self.min_perimeter)
+        labels = self._names[np.where(named, index, -1)]
+
+        shapes = []
+        for contour, label, length in zip(contours, labels, perimeter):
+            if label == "circle":
+                (x, y), r = cv.minEnclosingCircle(contour)
+                shapes.append(ClassifiedShape(label, contour, center=(int(x), int(y)), radius=int(r)))
+            elif label in POLYGON_NAMES.values():
+                shapes.append(ClassifiedShape(label, contour, approx=cv.approxPolyDP(contour, 0.02 * length, True)))
+            elif label != UNIDENTIFIED:
+                shapes.append(ClassifiedShape(label, contour, approx=_outline(label, contour, None)))
+            else:
+                shapes.append(ClassifiedShape(label, contour))
+        return shapes
+
+# Classifiers selectable with SHAPE_CLASSIFIER
+CLASSIFIERS = {
+    "basic": ShapeClassifier,
+    "extended": ExtendedShapeClassifier,
+    "templates": TemplateShapeClassifier,
+}
@@ -0,0 +1,259 @@
+import numpy as np
+
+# Boxes spanning more grid cells than this are kept in a short list that
+# every query scans, so one huge outline can't blow up the grid.
+MAX_CELLS_PER_BOX = 64
+
+# cv.findContours hierarchy columns
+NEXT, PREVIOUS, FIRST_CHILD, PARENT = range(4)
+
+def contour_boxes(contours):
+    """(n, 4) array of inclusive x0, y0, x1, y1 bounding boxes, one per contour."""
+    if len(contours) == 0:
+        return np.empty((0, 4), dtype=np.float64)
+    points = np.concatenate([np.asarray(c).reshape(-1, 2) for c in contours]).astype(np.float64)
+    starts = np.cumsum([0] + [len(np.asarray(c).reshape(-1, 2)) for c in contours[:-1]])
+    lo = np.minimum.reduceat(points, starts, axis=0)
+    hi = np.maximum.reduceat(points, starts, axis=0)
+    return np.hstack((lo, hi))
+
+def boxes_intersect(boxes, box):
+    """Mask of the rows of boxes that intersect or touch box; all are inclusive x0, y0, x1, y1."""
+    box = np.asarray(box).reshape(4)
+    return (boxes[:, 0] <= box[2]) & (box[0] <= boxes[:, 2]) & \
+           (boxes[:, 1] <= box[3]) & (box[1] <= boxes[:, 3])
+
+class ShapeIndex:
+    """
+    Uniform-grid index over shape bounding boxes plus the contour tree.
+
+    Every box is registered in each grid cell it covers; the (cell, shape)
+    pairs are kept sorted by cell so a query only visits the cells under
+    its box and binary-searches each one. With the default cell size (the
+    median box extent) a box covers a handful of cells and a query costs
+    roughly the number of shapes near it rather than the number of shapes.
+
+    Shape i is row i of boxes, which matches contour i of findContours
+    and shape i of ShapeClassifier.classify. Boxes that touch count as
+    intersecting, since strokes that meet at a pixel belong together.
+    """
+
+    def __init__(self, boxes, hierarchy=None, cell_size=None):
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        n = len(self.boxes)
+        self.parents = np.full(n, -1, dtype=np.intp)
+        if hierarchy is not None and n:
+            self.parents[:] = np.asarray(hierarchy).reshape(-1, 4)[:, PARENT]
+
+        if cell_size is None:
+            extent = np.maximum(self.boxes[:, 2] - self.boxes[:, 0], self.boxes[:, 3] - self.boxes[:, 1])
+            cell_size = np.median(extent) if n else 1.0
+        self.cell_size = max(float(cell_size), 1.0)
+
+        if n == 0:
+            self._origin = np.zeros(2, dtype=np.int64)
+            self._columns = 1
+            self._keys = np.empty(0, dtype=np.int64)
+            self._ids = np.empty(0, dtype=np.intp)
+            self._large = np.empty(0, dtype=np.intp)
+            return
+
+        lo, hi = self._cells(self.boxes)
+        self._origin = lo.min(axis=0)
+        self._columns = int(hi[:, 0].max() - self._origin[0] + 1)
+        spans = hi - lo + 1
+        counts = spans[:, 0] * spans[:, 1]
+
+        large = counts > MAX_CELLS_PER_BOX
+        self._large = np.flatnonzero(large)
+        small = np.flatnonzero(~large)
+
+        # Expand every small box into one (cell, shape) entry per covered cell
+        ids = np.repeat(small, counts[small])
+        first = np.repeat(np.cumsum(counts[small]) - counts[small], counts[small])
+        step = np.arange(len(ids)) - first
+        x = lo[ids, 0] + step % spans[ids, 0]
+        y = lo[ids, 1] + step // spans[ids, 0]
+
+        keys = self._key(x, y)
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        self._ids = ids[order]
+
+    @classmethod
+    def from_contours(cls, contours, hierarchy=None, cell_size=None):
+        return cls(contour_boxes(contours), hierarchy, cell_size)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def _cells(self, boxes):
+        cells = np.floor(boxes / self.cell_size).astype(np.int64)
+        return cells[:, :2], cells[:, 2:]
+
+    def _key(self, x, y):
+        return (y - self._origin[1]) * self._columns + (x - self._origin[0])
+
+    def query(self, box):
+        """Indices of the shapes whose boxes intersect box (x0, y0, x1, y1), sorted."""
+        box = np.asarray(box, dtype=np.float64).reshape(1, 4)
+        if len(self._keys):
+            lo, hi = self._cells(box)
+            # Rows outside the grid hold no entries
+            lo = np.maximum(lo[0], self._origin)
+            rows = np.arange(lo[1], hi[0, 1] + 1)
+            columns = np.arange(lo[0], min(hi[0, 0], self._origin[0] + self._columns - 1) + 1)
+            row_starts = self._key(columns[:1], rows) if len(columns) else np.empty(0, dtype=np.int64)
+            # Cells of one row are contiguous keys, so each row is one range
+            start = np.searchsorted(self._keys, row_starts, 'left')
+            stop = np.searchsorted(self._keys, row_starts + len(columns), 'left')
+            found = [self._ids[a:b] for a, b in zip(start, stop) if b > a]
+        else:
+            found = []
+        found.append(self._large)
+        candidates = np.unique(np.concatenate(found))
+
+        return candidates[boxes_intersect(self.boxes[candidates], box)]
+
+    def intersecting(self, i):
+        """Shapes other than i whose boxes intersect the box of shape i."""
+        found = self.query(self.boxes[i])
+        return found[found != i]
+
+    def containing(self, i):
+        """Shapes other than i whose boxes contain the box of shape i."""
+        found = self.intersecting(i)
+        boxes = self.boxes[found]
+        box = self.boxes[i]
+        inside = np.all(boxes[:, :2] <= box[:2], axis=1) & np.all(box[2:] <= boxes[:, 2:], axis=1)
+        return found[inside]
+
+    def contained(self, i):
+        """Shapes other than i whose boxes lie inside the box of shape i."""
+        found = self.intersecting(i)
+        boxes = self.boxes[found]
+        box = self.boxes[i]
+        inside = np.all(box[:2] <= boxes[:, :2], axis=1) & np.all(boxes[:, 2:] <= box[2:], axis=1)
+        return found[inside]
+
+    def overlapping_pairs(self):
+        """(m, 2) array of every intersecting pair (i, j) with i < j."""
+        pairs = []
+        for i in range(len(self.boxes)):
+            found = self.query(self.boxes[i])
+            found = found[found > i]
+            pairs.append(np.column_stack((np.full(len(found), i), found)))
+        if not pairs:
+            return np.empty((0, 2), dtype=np.intp)
+        return np.concatenate(pairs).astype(np.intp)
+
+    def parent(self, i):
+        """Enclosing contour of shape i in the findContours tree, or -1."""
+        return int(self.parents[i])
+
+    def children(self, i):
+        return np.flatnonzero(self.parents == i)
+
+    def ancestors(self, i):
+        """Enclosing contours of shape i from the innermost outwards."""
+        found = []
+        i = self.parents[i]
+        while i >= 0:
+            found.append(int(i))
+            i = self.parents[i]
+        return np.array(found, dtype=np.intp)
+
+    def descendants(self, i):
+        """Every contour nested inside shape i, in breadth-first order."""
+        found = []
+        level = self.children(i)
+        while len(level):
+            found.extend(level.tolist())
+            level = np.flatnonzero(np.isin(self.parents, level))
+        return np.array(found, dtype=np.intp)
+
+class LiveShapeIndex:
+    """
+    ShapeIndex over boxes that are added and removed between queries,
+    keyed by any hashable id.
+
+    The grid is rebuilt only once enough has changed: new boxes wait in an
+    array that every query scans, and removed ones are dropped from the
+    grid's results, until together they pass rebuild_fraction of the live
+    boxes (and at least min_pending). Edits then cost no more than a
+    query, and a query stays close to ShapeIndex.query.
+    """
+
+    def __init__(self, rebuild_fraction=0.125, min_pending=64):
+        self.rebuild_fraction = rebuild_fraction
+        self.min_pending = min_pending
+        self.clear()
+
+    def clear(self):
+        self._index = ShapeIndex(np.empty((0, 4)))
+        self._keys = []
+        self._rows = {}
+        self._boxes = {}
+        self._pending_keys = []
+        self._pending_slots = {}
+        self._pending_boxes = np.empty((self.min_pending, 4))
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, key):
+        return key in self._boxes
+
+    def __iter__(self):
+        return iter(self._boxes)
+
+    def __getitem__(self, key):
+        return self._boxes[key]
+
+    def add(self, key, box):
+        """Add the box (x0, y0, x1, y1) of key, replacing any box it had."""
+        self.pop(key)
+        box = np.asarray(box)
+        self._boxes[key] = box
+        slot = len(self._pending_keys)
+        if slot == len(self._pending_boxes):
+            self._pending_boxes = np.vstack((self._pending_boxes, np.empty_like(self._pending_boxes)))
+        self._pending_boxes[slot] = box
+        self._pending_keys.append(key)
+        self._pending_slots[key] = slot
+        if len(self._pending_keys) + self._dead > max(self.min_pending, self.rebuild_fraction * len(self._boxes)):
+            self._rebuild()
+
+    def pop(self, key, default=None):
+        """Remove key and return its box, or default if it has none."""
+        box = self._boxes.pop(key, None)
+        if box is None:
+            return default
+        slot = self._pending_slots.pop(key, None)
+        if slot is None:
+            del self._rows[key]
+        else:
+            # NaN compares false, so the slot never intersects anything
+            self._pending_boxes[slot] = np.nan
+        self._dead += 1
+        return box
+
+    def _rebuild(self):
+        self._keys = list(self._boxes)
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+        boxes = np.array([self._boxes[key] for key in self._keys], dtype=np.float64).reshape(-1, 4)
+        self._index = ShapeIndex(boxes)
+        self._pending_keys = []
+        self._pending_slots = {}
+        self._dead = 0
+
+    def query(self, box):
+        """Keys whose boxes intersect box (x0, y0, x1, y1)."""
+        found = [self._keys[row] for row in self._index.query(box)]
+        # A row whose key was removed or re-added since the rebuild is stale
+        found = [key for key in found if key in self._rows]
+        if self._pending_keys:
+            boxes = self._pending_boxes[:len(self._pending_keys)]
+            found.extend(self._pending_keys[slot] for slot in np.flatnonzero(boxes_intersect(boxes, box)))
+        return found
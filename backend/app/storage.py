@@ -0,0 +1,154 @@
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+from .config import Config
+from .metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+class StorageBackend:
+    """Stores uploaded artifacts under string keys such as 'images/<id>/x.png'."""
+
+    def upload(self, data, key):
+        raise NotImplementedError
+
+    def url(self, key):
+        raise NotImplementedError
+
+class LocalStorage(StorageBackend):
+    """Writes objects below a root directory; for tests and air-gapped deployments."""
+
+    def __init__(self, root):
+        self.root = Path(root).resolve()
+
+    def _path(self, key):
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Storage key escapes the storage root: {key}")
+        return path
+
+    def upload(self, data, key):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        return self.url(key)
+
+    def url(self, key):
+        return self._path(key).as_uri()
+
+class FirebaseStorage(StorageBackend):
+    """Firebase Storage bucket; the Firebase app is initialized on first use."""
+
+    _init_lock = threading.Lock()
+
+    def __init__(self, credentials_path, bucket_name):
+        self.credentials_path = credentials_path
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            import firebase_admin
+            from firebase_admin import credentials, storage
+
+            with self._init_lock:
+                try:
+                    firebase_admin.get_app()
+                except ValueError:
+                    cred = credentials.Certificate(self.credentials_path)
+                    firebase_admin.initialize_app(cred, {'storageBucket': self.bucket_name})
+            self._bucket = storage.bucket(self.bucket_name)
+        return self._bucket
+
+    def upload(self, data, key):
+        blob = self._get_bucket().blob(key)
+        # The client only takes bytes, not the memoryviews the encoder hands out
+        blob.upload_from_string(data if isinstance(data, bytes) else bytes(data))
+        return self.url(key)
+
+    def url(self, key):
+        # The Firebase download URL the frontend reads the images from; it
+        # needs no credentials, so asking for it doesn't initialize the app
+        return f"https://firebasestorage.googleapis.com/v0/b/{self.bucket_name}/o/{quote(key, safe='')}?alt=media"
+
+class UploadQueue:
+    """
+    Uploads objects on background threads so requests don't wait on the
+    storage round trip. The queue is bounded: submit blocks for at most
+    `timeout` seconds and raises queue.Full when the workers can't keep
+    up. Failed uploads are retried with exponential backoff.
+    """
+
+    def __init__(self, backend, workers=2, maxsize=64, retries=3, backoff=0.5):
+        self.backend = backend
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.uploaded = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        # Threads don't survive fork, so each worker process starts its own.
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f"upload-{i}", daemon=True).start()
+
+    def submit(self, data, key, timeout=1.0):
+        self._ensure_started()
+        self._queue.put((data, key), timeout=timeout)
+
+    def join(self):
+        """Block until every submitted upload has finished or given up."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            data, key = self._queue.get()
+            try:
+                self._upload(data, key)
+            finally:
+                self._queue.task_done()
+
+    def _upload(self, data, key):
+        for attempt in range(self.retries + 1):
+            try:
+                start = time.perf_counter()
+                self.backend.upload(data, key)
+                record_stage('upload', time.perf_counter() - start)
+                with self._lock:
+                    self.uploaded += 1
+                return
+            except Exception:
+                if attempt == self.retries:
+                    logger.exception("Upload of %s failed after %d attempts", key, attempt + 1)
+                    with self._lock:
+                        self.failed += 1
+                    return
+                time.sleep(self.backoff * 2 ** attempt)
+
+def create_storage(kind=None):
+    kind = kind or Config.STORAGE_BACKEND
+    if kind == 'local':
+        return LocalStorage(Config.LOCAL_STORAGE_DIR)
+    if kind == 'firebase':
+        return FirebaseStorage(Config.FIREBASE_CREDENTIALS, Config.FIREBASE_BUCKET)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+def create_upload_queue(backend=None):
+    return UploadQueue(backend or create_storage(),
+                       workers=Config.UPLOAD_WORKERS,
+                       maxsize=Config.UPLOAD_QUEUE_SIZE,
+                       retries=Config.UPLOAD_RETRIES)
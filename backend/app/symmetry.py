@@ -0,0 +1,238 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# Points each outline is resampled to
+SAMPLES = 32
+
+# Candidate axes closer together than this are one axis found twice, and
+# the parabola refining an axis samples this far to either side of it
+MIN_AXIS_GAP = np.pi / 36
+REFINE_STEP = np.pi / 72
+
+# Largest accepted mean distance between an outline and its reflection,
+# relative to the outline's RMS radius across its narrower principal axis
+# (the plain RMS radius for round outlines), so thin shapes aren't let off
+# for being thin
+SYMMETRY_THRESHOLD = 0.05
+
+@dataclass
+class SymmetryAxis:
+    shape: int
+    center: np.ndarray
+    direction: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    error: float
+
+def resample_outline(points, samples=SAMPLES):
+    """
+    Resample a closed outline to evenly spaced points along its perimeter.
+    Returns the points and the index of the edge each one lies on, or
+    None for an outline of zero length.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    closed = np.vstack((points, points[:1]))
+    lengths = np.hypot(*np.diff(closed, axis=0).T)
+    distance = np.concatenate(([0.0], np.cumsum(lengths)))
+    if distance[-1] == 0:
+        return None
+    at = np.linspace(0, distance[-1], samples, endpoint=False)
+    edges = np.minimum(np.searchsorted(distance, at, 'right') - 1, len(points) - 1)
+    resampled = np.column_stack((np.interp(at, distance, closed[:, 0]), np.interp(at, distance, closed[:, 1])))
+    return resampled, edges
+
+def outline_centroid(points):
+    """Centroid of a closed outline's perimeter, independent of where it was sampled."""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    following = np.roll(points, -1, axis=0)
+    lengths = np.hypot(*(following - points).T)
+    return ((points + following) / 2 * lengths[:, None]).sum(axis=0) / lengths.sum()
+
+def _segment_distance(points, a, b):
+    ab = b - a
+    length = np.einsum('ij,ij->i', ab, ab)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.clip(np.einsum('ij,ij->i', points - a, ab) / length, 0, 1)
+    t[length == 0] = 0
+    return np.hypot(*(a + t[:, None] * ab - points).T)
+
+class _OutlineSet:
+    """
+    Normalized outlines of every shape in one KD-tree.
+
+    Each outline is centered, scaled to unit RMS radius and shifted along
+    x by its own slot, far enough apart that a reflected point can only
+    find neighbours on its own outline. One tree query then scores every
+    (shape, axis) candidate of the image at once. The tree holds the
+    evenly resampled points; distances are measured to the original
+    edges around the nearest sample, so sparse samples don't cut corners.
+    """
+
+    def __init__(self, samples, edges, vertices):
+        # scipy.spatial is a third of the app's import time
+        from scipy.spatial import cKDTree
+
+        self.samples = samples
+        self.edges = edges.ravel()
+        radius = max(np.abs(v).max() for v in vertices)
+        self.offsets = np.zeros((len(samples), 2))
+        self.offsets[:, 0] = np.arange(len(samples)) * (4 * radius + 1)
+
+        self.vertex_count = np.array([len(v) for v in vertices])
+        self.vertex_start = np.cumsum(self.vertex_count) - self.vertex_count
+        self.vertices = np.concatenate([v + self.offsets[i] for i, v in enumerate(vertices)])
+        self.tree = cKDTree((samples + self.offsets[:, None, :]).reshape(-1, 2))
+
+    def errors(self, shapes, directions):
+        """Mean outline-to-reflection distance for each (shape, unit direction) pair."""
+        per_shape = self.samples.shape[1]
+        samples = self.samples[shapes]
+        directions = directions[:, None, :]
+        reflected = 2 * np.sum(samples * directions, axis=2, keepdims=True) * directions - samples
+        queries = (reflected + self.offsets[shapes][:, None, :]).reshape(-1, 2)
+
+        # Two neighbours, since on a thin shape the nearest sample can be
+        # across the shape rather than on the edge the point landed on
+        _, nearest = self.tree.query(queries, k=2, workers=-1)
+        owner = nearest[:, 0] // per_shape
+        start = self.vertex_start[owner]
+        count = self.vertex_count[owner]
+        distance = np.full(len(queries), np.inf)
+        for sample in nearest.T:
+            for step in (-1, 0, 1):
+                edge = (self.edges[sample] + step) % count
+                a = self.vertices[start + edge]
+                b = self.vertices[start + (edge + 1) % count]
+                distance = np.minimum(distance, _segment_distance(queries, a, b))
+        return distance.reshape(len(shapes), per_shape).mean(axis=1)
+
+def _directions(angles):
+    return np.column_stack((np.cos(angles), np.sin(angles)))
+
+def _candidate_angles(vertices, principal):
+    """
+    (shape, angle) of every candidate axis: both principal axes and the
+    lines from the centroid through each vertex and each edge midpoint,
+    as in vector.polygon_axes. vertices are the centered outlines; a
+    reflection axis of a polygon maps vertices onto vertices, so it passes
+    through one of them or through the middle of an edge.
+    """
+    counts = np.array([len(v) for v in vertices])
+    shape = np.repeat(np.arange(len(vertices)), counts)
+    points = np.concatenate(vertices)
+    following = np.concatenate([np.roll(v, -1, axis=0) for v in vertices])
+    through = np.vstack((points, (points + following) / 2))
+    shapes = np.concatenate((shape, shape, np.arange(len(vertices)), np.arange(len(vertices))))
+    angles = np.concatenate((np.arctan2(through[:, 1], through[:, 0]), principal, principal + np.pi / 2))
+    # A direction through the centroid itself names no axis
+    valid = np.concatenate((np.hypot(*through.T) > 1e-9, np.ones(2 * len(vertices), dtype=bool)))
+    shapes, angles = shapes[valid], np.mod(angles[valid], np.pi)
+
+    # Opposite vertices and midpoints of regular polygons give the same axis twice
+    order = np.lexsort((angles, shapes))
+    shapes, angles = shapes[order], angles[order]
+    repeated = np.zeros(len(angles), dtype=bool)
+    repeated[1:] = (shapes[1:] == shapes[:-1]) & (np.diff(angles) < 1e-6)
+    return shapes[~repeated], angles[~repeated]
+
+def detect_symmetry(outlines, threshold=SYMMETRY_THRESHOLD, samples=SAMPLES):
+    """
+    Find the reflection axes of each closed outline in one batch.
+
+    Every outline is tested against the axes through its centroid that
+    _candidate_angles seeds from its principal axes, vertices and edge
+    midpoints; a candidate within MIN_AXIS_GAP (or pi / 2n for an n-sided
+    outline, if wider) of a better one is dropped. Candidates that miss
+    the threshold by less than a factor of two are refined by a parabola
+    over the errors REFINE_STEP to either side and rescored, and the axes
+    whose error is below threshold are returned, best first within each
+    shape. error is relative to the RMS radius; start and end span the
+    outline along the axis, in the outline's coordinates.
+    """
+    resampled, edges, vertices, centers, index = [], [], [], [], []
+    for i, points in enumerate(outlines):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = resample_outline(points, samples)
+        if result is not None:
+            resampled.append(result[0])
+            edges.append(result[1])
+            vertices.append(points)
+            centers.append(outline_centroid(points))
+            index.append(i)
+    if not resampled:
+        return []
+
+    centers = np.array(centers)
+    centered = np.array(resampled) - centers[:, None, :]
+    scale = np.sqrt(np.mean(np.sum(centered ** 2, axis=2), axis=1))
+
+    # Smallest eigenvalue of each 2x2 covariance gives the narrower spread
+    xx, yy = np.mean(centered ** 2, axis=1).T
+    xy = np.mean(centered[:, :, 0] * centered[:, :, 1], axis=1)
+    minor = (xx + yy) / 2 - np.hypot((xx - yy) / 2, xy)
+    keep = np.flatnonzero(minor > 0)
+    if not len(keep):
+        return []
+    centers, centered, scale = centers[keep], centered[keep], scale[keep]
+    tolerance = threshold * np.sqrt(2 * minor[keep]) / scale
+    principal = 0.5 * np.arctan2(2 * xy[keep], xx[keep] - yy[keep])
+    index = [index[k] for k in keep]
+    normalized = [(vertices[k] - centers[i]) / scale[i] for i, k in enumerate(keep)]
+    outline_set = _OutlineSet(centered / scale[:, None, None], np.array(edges)[keep], normalized)
+
+    shapes, angles = _candidate_angles(normalized, principal)
+    errors = outline_set.errors(shapes, _directions(angles))
+
+    # Best candidates first; one that lands next to a better axis of its
+    # shape is that axis again
+    gap = np.maximum(np.pi / (2 * outline_set.vertex_count), MIN_AXIS_GAP)
+    kept = []
+    kept_angles = {}
+    for k in np.lexsort((errors, shapes)):
+        s = shapes[k]
+        if errors[k] >= 2 * tolerance[s]:
+            continue
+        taken = np.array(kept_angles.get(s, []))
+        difference = np.abs(taken - angles[k])
+        if np.all(np.minimum(difference, np.pi - difference) > gap[s]):
+            kept.append(k)
+            kept_angles.setdefault(s, []).append(angles[k])
+    if not kept:
+        return []
+    kept = np.array(kept)
+    shapes, final_angles, final_errors = shapes[kept], angles[kept], errors[kept]
+
+    # Only the near misses can still cross the threshold, so only they are
+    # refined; a seeded axis that already passes moves by a fraction of it
+    near = np.flatnonzero(final_errors >= tolerance[shapes])
+    if len(near):
+        which, a, e0 = shapes[near], final_angles[near], final_errors[near]
+        around = outline_set.errors(np.tile(which, 2),
+                                    _directions(np.concatenate((a - REFINE_STEP, a + REFINE_STEP))))
+        el, er = around[:len(near)], around[len(near):]
+        curvature = el - 2 * e0 + er
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shift = np.where(curvature > 0, 0.5 * (el - er) / curvature, 0.0)
+        refined_angles = a + np.clip(shift, -1, 1) * REFINE_STEP
+        refined = outline_set.errors(which, _directions(refined_angles))
+        better = refined < e0
+        final_angles[near] = np.where(better, refined_angles, a)
+        final_errors[near] = np.where(better, refined, e0)
+    directions = _directions(final_angles)
+
+    axes = []
+    for k in np.lexsort((final_errors, shapes)):
+        s = shapes[k]
+        if final_errors[k] >= tolerance[s]:
+            continue
+        along = centered[s] @ directions[k]
+        axes.append(SymmetryAxis(
+            shape=index[s],
+            center=centers[s],
+            direction=directions[k],
+            start=centers[s] + along.min() * directions[k],
+            end=centers[s] + along.max() * directions[k],
+            error=float(final_errors[k]),
+        ))
+    return axes
@@ -0,0 +1,187 @@
+import logging
+import os
+import tempfile
+
+import numpy as np
+import cv2 as cv
+
+logger = logging.getLogger(__name__)
+
+# Points each outline is resampled to before its Fourier transform, and
+# harmonics kept on either side of the fundamental
+SAMPLES = 64
+HARMONICS = 12
+DESCRIPTOR_SIZE = 2 * HARMONICS - 1
+
+# One library entry; a structured array of these is saved with np.save,
+# so np.load(mmap_mode='r') maps it without reading it in
+LIBRARY_DTYPE = np.dtype([('label', 'U24'), ('descriptor', '<f4', (DESCRIPTOR_SIZE,))])
+
+# Templates are drawn at this radius in pixels and turned by these angles
+# in degrees, so the library also holds the pixel steps of tilted edges
+TEMPLATE_RADIUS = 60
+TEMPLATE_ANGLES = (0, 15, 30, 45)
+
+def _regular(sides, radius=1.0, phase=0.0):
+    angles = phase + np.arange(sides) * 2 * np.pi / sides
+    return np.column_stack((radius * np.cos(angles), radius * np.sin(angles)))
+
+def _star(points, inner):
+    radii = np.where(np.arange(2 * points) % 2 == 0, 1.0, inner)
+    angles = np.arange(2 * points) * np.pi / points
+    return np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))
+
+def _rounded_rectangle(ratio, corner):
+    corners = []
+    for k, (x, y) in enumerate([(1, ratio), (-1, ratio), (-1, -ratio), (1, -ratio)]):
+        center = np.array([x - np.sign(x) * corner, y - np.sign(y) * corner])
+        t = np.linspace(k * np.pi / 2, (k + 1) * np.pi / 2, 16)
+        corners.append(center + corner * np.column_stack((np.cos(t), np.sin(t))))
+    return np.vstack(corners)
+
+def template_outlines():
+    """(label, unit-sized outline, closed) of every shape the library is built from."""
+    t = np.linspace(0, 2 * np.pi, 180, endpoint=False)
+    outlines = [("circle", np.column_stack((np.cos(t), np.sin(t))), True)]
+    outlines += [("ellipse", np.column_stack((np.cos(t), ratio * np.sin(t))), True)
+                 for ratio in (0.3, 0.4, 0.5, 0.6, 0.7, 0.8)]
+    outlines += [("rectangle", np.array([[-1, -ratio], [1, -ratio], [1, ratio], [-1, ratio]]), True)
+                 for ratio in (0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)]
+    outlines += [("rounded_rectangle", _rounded_rectangle(ratio, corner * ratio), True)
+                 for ratio in (0.4, 0.6, 0.8, 1.0) for corner in (0.5, 0.8)]
+    outlines += [("triangle", np.array(points, dtype=np.float64), True) for points in (
+        _regular(3),
+        [[-1, -0.5], [1, -0.5], [0, 1]],
+        [[-1, -0.5], [1, -0.5], [0, 0.3]],
+        [[-1, -1], [1, -1], [-1, 1]],
+    )]
+    outlines += [(name, _regular(sides), True)
+                 for name, sides in (("pentagon", 5), ("hexagon", 6), ("heptagon", 7), ("octagon", 8))]
+    outlines += [("star", _star(points, inner), True) for points, inner in ((5, 0.35), (5, 0.45), (5, 0.55), (6, 0.5))]
+    # A shaky line comes back as a thin loop rather than a single run of pixels
+    outlines.append(("line", np.array([[-1, 0], [1, 0]], dtype=np.float64), False))
+    outlines += [("line", np.array([[-1, -width], [1, -width], [1, width], [-1, width]]), True)
+                 for width in (0.02, 0.04)]
+    return outlines
+
+def _template_contour(outline, closed, angle):
+    rotation = np.radians(angle)
+    matrix = np.array([[np.cos(rotation), -np.sin(rotation)], [np.sin(rotation), np.cos(rotation)]])
+    points = outline @ matrix.T * TEMPLATE_RADIUS + TEMPLATE_RADIUS * 1.5
+    img = np.zeros((TEMPLATE_RADIUS * 3, TEMPLATE_RADIUS * 3), dtype=np.uint8)
+    cv.polylines(img, [np.rint(points).astype(np.int32)], isClosed=closed, color=255, thickness=1)
+    contours, _ = cv.findContours(img, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+    return max(contours, key=len)
+
+def build_library():
+    """
+    Library of every template_outlines shape at every TEMPLATE_ANGLES
+    turn, described from the outer contour of its rasterized stroke, the
+    same contour the pipeline classifies.
+    """
+    entries = [(label, _template_contour(outline, closed, angle))
+               for label, outline, closed in template_outlines() for angle in TEMPLATE_ANGLES]
+    library = np.empty(len(entries), dtype=LIBRARY_DTYPE)
+    library['label'] = [label for label, _ in entries]
+    library['descriptor'] = fourier_descriptors([contour for _, contour in entries])
+    return library
+
+def save_library(library, path):
+    """Write the library to path atomically, so workers starting together never map half a file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.npy')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, library, allow_pickle=False)
+        # mkstemp creates the file private to this user
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def load_library(path):
+    """
+    The library at path, memory-mapped read-only so every process of a
+    host shares one copy in the page cache. A missing or outdated file is
+    rebuilt first; if it can't be written the built library is used
+    from memory.
+    """
+    try:
+        library = np.load(path, mmap_mode='r', allow_pickle=False)
+        if library.dtype == LIBRARY_DTYPE:
+            return library
+    except (OSError, ValueError):
+        pass
+
+    library = build_library()
+    try:
+        save_library(library, path)
+    except OSError as e:
+        logger.warning("Could not write the shape library to %s: %s", path, e)
+        return library
+    return np.load(path, mmap_mode='r', allow_pickle=False)
+
+def fourier_descriptors(contours, samples=SAMPLES, harmonics=HARMONICS):
+    """
+    (n, 2 * harmonics - 1) float32 descriptors of closed outlines, for
+    all of them at once. Each outline is resampled to evenly spaced
+    points, traversed counter-clockwise, and transformed with one FFT
+    over the whole batch; the magnitudes of the harmonics around the
+    fundamental, divided by the fundamental's, don't depend on position,
+    size, rotation or starting point. Outlines of zero length get NaNs.
+    """
+    descriptors = np.full((len(contours), 2 * harmonics - 1), np.nan, dtype=np.float32)
+    if len(contours) == 0:
+        return descriptors
+
+    # Consecutive outlines, each closed by repeating its first point, one
+    # unit apart on one distance axis
+    counts = np.fromiter((len(c) for c in contours), dtype=np.int64, count=len(contours))
+    flat = np.concatenate([c.reshape(-1, 2) for c in contours]).astype(np.float64)
+    ends = np.cumsum(counts)
+    points = np.insert(flat, ends, flat[ends - counts], axis=0)
+    counts += 1
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    ends = np.cumsum(counts) - 1
+    steps[ends[:-1]] = 1
+    distance = np.concatenate(([0.0], np.cumsum(steps)))
+    starts = distance[ends - counts + 1]
+    lengths = distance[ends] - starts
+
+    valid = np.flatnonzero(lengths > 0)
+    if len(valid) == 0:
+        return descriptors
+    at = starts[valid, None] + lengths[valid, None] * (np.arange(samples) / samples)
+    z = np.interp(at, distance, points[:, 0]) + 1j * np.interp(at, distance, points[:, 1])
+
+    # Outlines with a negative signed area are reversed to run counter-clockwise
+    area = np.sum(z.real * np.roll(z.imag, -1, axis=1) - np.roll(z.real, -1, axis=1) * z.imag, axis=1)
+    z[area < 0] = z[area < 0, ::-1]
+
+    spectrum = np.abs(np.fft.fft(z, axis=1))
+    order = np.r_[2:harmonics + 1, -harmonics:0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        descriptors[valid] = spectrum[:, order] / spectrum[:, 1:2]
+    return descriptors
+
+def nearest_templates(descriptors, library):
+    """
+    Index into library of the closest template to each descriptor row
+    and the Euclidean distance to it, for the whole batch in one matrix
+    product. Rows that aren't finite get index -1 and an infinite
+    distance.
+    """
+    templates = np.asarray(library['descriptor'], dtype=np.float32)
+    if len(descriptors) == 0 or len(templates) == 0:
+        return np.full(len(descriptors), -1), np.full(len(descriptors), np.inf)
+    missing = ~np.isfinite(descriptors).all(axis=1)
+    queries = np.where(missing[:, None], 0, descriptors)
+    squared = (np.sum(queries ** 2, axis=1)[:, None] + np.sum(templates ** 2, axis=1)[None, :]
+               - 2 * queries @ templates.T)
+    index = np.argmin(squared, axis=1)
+    distance = np.sqrt(np.maximum(squared[np.arange(len(index)), index], 0))
+    index[missing] = -1
+    distance[missing] = np.inf
+    return index, distance
@@ -0,0 +1,183 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2 as cv
+
+from .config import Config
+from .spatial import NEXT, PARENT, PREVIOUS
+
+# Side in pixels of the tiles the canvas is split into; a tile grows past
+# its edges to cover the shapes that start in it, so tiles overlap
+TILE = 512
+# Side of the coarse cells shapes are grouped on; any stroke pixel marks its cell
+BLOCK = 8
+# Classification batches per pool thread, so one slow batch doesn't leave the rest idle
+BATCHES_PER_WORKER = 4
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def contour_workers():
+    return Config.CONTOUR_WORKERS or os.cpu_count() or 1
+
+def use_tiles(shape):
+    """Whether a binary canvas of this shape is large enough to split up on several threads."""
+    threshold = Config.CONTOUR_TILE_PIXELS
+    return threshold > 0 and contour_workers() > 1 and shape[0] * shape[1] >= threshold
+
+def _executor():
+    # Threads don't survive fork, so each worker process starts its own pool
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(contour_workers(), thread_name_prefix="contours")
+            _pool_pid = os.getpid()
+        return _pool
+
+def _mark_cells(binary, block):
+    """uint8 image with one pixel per block x block cell, 1 where any pixel of the cell is set."""
+    height, width = binary.shape
+    rows, cols = -(-height // block), -(-width // block)
+    whole_rows, whole_cols = height // block, width // block
+    coarse = np.zeros((rows, cols), dtype=np.uint8)
+    if whole_rows and whole_cols:
+        # Area averaging keeps a lone 255 pixel at 255 / block**2, which rounds up to 1 or more
+        area = cv.resize(binary[:whole_rows * block, :whole_cols * block], (whole_cols, whole_rows),
+                         interpolation=cv.INTER_AREA)
+        coarse[:whole_rows, :whole_cols] = area > 0
+    # Cells cut off by the right and bottom edges
+    if whole_cols < cols:
+        strip = np.zeros((rows * block, width - whole_cols * block), dtype=binary.dtype)
+        strip[:height] = binary[:, whole_cols * block:]
+        coarse[:, -1] = strip.reshape(rows, -1).max(axis=1) > 0
+    if whole_rows < rows and whole_cols:
+        strip = binary[whole_rows * block:]
+        coarse[-1, :whole_cols] |= strip[:, :whole_cols * block].reshape(-1, whole_cols, block).max(axis=(0, 2)) > 0
+    return coarse
+
+def contour_groups(binary, block=BLOCK):
+    """
+    Group the foreground into pieces whose contours can be found apart.
+
+    The image is reduced to cells of block x block pixels, marked where any
+    pixel is set, and the holes of that coarse image are filled, so a
+    shape and everything drawn inside it land in one 8-connected group.
+    Returns the group label of every cell (0 for background) and each
+    group's inclusive (x0, y0, x1, y1) pixel box; boxes of different
+    groups can overlap, but no contour of one group encloses another.
+    """
+    height, width = binary.shape
+    coarse = _mark_cells(binary, block)
+
+    # Background not 4-connected to the frame is a hole of some shape
+    framed = cv.copyMakeBorder(1 - coarse, 1, 1, 1, 1, cv.BORDER_CONSTANT, value=1)
+    _, background = cv.connectedComponents(framed, connectivity=4)
+    filled = (background[1:-1, 1:-1] != background[0, 0]).astype(np.uint8)
+
+    _, labels, stats, _ = cv.connectedComponentsWithStats(filled, connectivity=8)
+    boxes = stats[1:, :4].astype(np.int64) * block
+    x1 = np.minimum(boxes[:, 0] + boxes[:, 2], width) - 1
+    y1 = np.minimum(boxes[:, 1] + boxes[:, 3], height) - 1
+    return labels, np.column_stack((boxes[:, 0], boxes[:, 1], x1, y1))
+
+def _batches(items, weights, count):
+    """Split items into at most count consecutive runs of roughly equal total weight."""
+    if len(items) == 0:
+        return []
+    cumulative = np.cumsum(weights, dtype=np.float64)
+    cuts = np.searchsorted(cumulative, cumulative[-1] * np.arange(1, count) / count)
+    return [run for run in np.split(np.asarray(items), np.unique(cuts)) if len(run)]
+
+def contour_tiles(binary, tile=TILE, block=BLOCK):
+    """
+    Assign every contour_groups group to the tile x tile pixel tile that
+    holds the top-left corner of its box. Returns the tile owning each
+    coarse cell (-1 for background) and each tile's inclusive
+    (x0, y0, x1, y1) crop, the union of its groups' boxes.
+    """
+    labels, boxes = contour_groups(binary, block)
+    columns = -(-binary.shape[1] // tile)
+    keys = (boxes[:, 1] // tile) * columns + boxes[:, 0] // tile
+    tiles, owner = np.unique(keys, return_inverse=True)
+    crops = np.empty((len(tiles), 4), dtype=np.int64)
+    crops[:, :2] = np.iinfo(np.int64).max
+    crops[:, 2:] = -1
+    np.minimum.at(crops[:, :2], owner, boxes[:, :2])
+    np.maximum.at(crops[:, 2:], owner, boxes[:, 2:])
+    cell_tile = np.append(-1, owner)[labels]
+    return cell_tile, crops
+
+def _tile_contours(binary, cell_tile, crop, index, block):
+    """
+    Contours in one tile's crop, keeping only the top-level contours (and
+    what they enclose) that start in a cell the tile owns. Strokes of
+    other groups in the crop are never 8-adjacent to the tile's own and
+    never enclose them, so they don't change the tile's contours.
+    """
+    x0, y0, x1, y1 = crop
+    padded = cv.copyMakeBorder(binary[y0:y1 + 1, x0:x1 + 1], 1, 1, 1, 1, cv.BORDER_CONSTANT, value=0)
+    contours, hierarchy = cv.findContours(padded, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE,
+                                          offset=(int(x0) - 1, int(y0) - 1))
+    if not contours:
+        return None
+    hierarchy = hierarchy[0]
+    starts = np.array([contour[0, 0] for contour in contours])
+    roots = np.flatnonzero((hierarchy[:, PARENT] == -1) &
+                           (cell_tile[starts[:, 1] // block, starts[:, 0] // block] == index))
+    return contours, hierarchy, starts, roots
+
+def find_contours_tiled(binary, tile=TILE, block=BLOCK):
+    """
+    cv.findContours(binary, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE), computed
+    per contour_tiles tile on the contour thread pool.
+
+    findContours lists each top-level contour followed by everything
+    nested in it, with top-level contours in descending raster order of
+    their first point. Each tile yields whole top-level subtrees; they are
+    put back in that order and the hierarchy is renumbered, so the result
+    is identical to the single call.
+    """
+    cell_tile, crops = contour_tiles(binary, tile, block)
+    results = _executor().map(lambda index: _tile_contours(binary, cell_tile, crops[index], index, block),
+                              range(len(crops)))
+
+    # Every kept subtree as a run of contours in the concatenated tile outputs
+    contours, hierarchies, keys, runs = [], [], [], []
+    for found in results:
+        if found is None:
+            continue
+        tile_contours, hierarchy, starts, roots = found
+        base = len(contours)
+        top = np.append(np.flatnonzero(hierarchy[:, PARENT] == -1), len(tile_contours))
+        ends = top[np.searchsorted(top, roots, side='right')]
+        contours.extend(tile_contours)
+        hierarchies.append(np.where(hierarchy >= 0, hierarchy + base, -1))
+        keys.append(starts[roots, 1] * (binary.shape[1] + 1) + starts[roots, 0])
+        runs.append(np.column_stack((roots + base, ends + base)))
+    if not runs:
+        return (), None
+
+    keys = np.concatenate(keys)
+    runs = np.concatenate(runs)[np.argsort(-keys, kind='stable')]
+    order = np.concatenate([np.arange(a, b) for a, b in runs])
+    position = np.full(len(contours), -1, dtype=np.int64)
+    position[order] = np.arange(len(order))
+
+    old = np.concatenate(hierarchies)[order]
+    hierarchy = np.where(old >= 0, position[np.maximum(old, 0)], -1)
+    # Top-level contours are linked to each other in their new order
+    tops = position[runs[:, 0]]
+    hierarchy[tops, NEXT] = np.append(tops[1:], -1)
+    hierarchy[tops, PREVIOUS] = np.append(-1, tops[:-1])
+    return tuple(contours[i] for i in order), hierarchy[np.newaxis].astype(np.int32)
+
+def classify_tiled(classifier, contours):
+    """classifier.classify(contours) split into batches on the contour thread pool."""
+    workers = contour_workers()
+    sizes = [len(contour) for contour in contours]
+    batches = _batches(np.arange(len(contours)), sizes, workers * BATCHES_PER_WORKER)
+    results = _executor().map(lambda batch: classifier.classify([contours[i] for i in batch]), batches)
+    return [shape for shapes in results for shape in shapes]
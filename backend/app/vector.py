@@ -0,0 +1,341 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import cv2 as cv
+
+from .polylines import circle_polyline, sample_arc
+from .shapes import POLYGON_NAMES, SHAPE_COLORS, UNIDENTIFIED
+from .symmetry import SYMMETRY_THRESHOLD, outline_centroid
+
+ENGINES = ('raster', 'vector')
+
+# A stroke is closed when the gap between its ends is at most this
+# fraction of its length
+CLOSED_TOLERANCE = 0.1
+# Largest RMS residual of an accepted fit, relative to the line's length
+# or the circle's radius (the geometric mean of the ellipse's semi-axes)
+LINE_TOLERANCE = 0.02
+CIRCLE_TOLERANCE = 0.05
+ELLIPSE_TOLERANCE = 0.02
+# approxPolyDP epsilon as a fraction of the perimeter, as in ShapeClassifier
+POLYGON_EPSILON = 0.02
+# Largest relative spread of the side lengths and vertex radii of a
+# regular polygon, and largest corner deviation of a rectangle in degrees
+REGULAR_TOLERANCE = 0.08
+RIGHT_ANGLE_TOLERANCE = 15
+
+# Output image colours, matching the raster route
+LINE_COLOR = (255, 255, 255)
+RECTANGLE_COLOR = (255, 0, 0)
+ROUND_COLOR = (0, 0, 255)
+AXIS_COLOR = (0, 255, 0)
+UNIDENTIFIED_COLOR = (255, 255, 0)
+
+@dataclass
+class FittedShape:
+    label: str
+    outline: np.ndarray
+    axes: list = field(default_factory=list)
+
+    def polylines(self):
+        return [self.outline] + list(self.axes)
+
+def split_strokes(polylines):
+    """
+    Split four-column (path id, shape id, x, y) rows into float point
+    arrays, one per run of rows with the same ids. Single points are dropped.
+    """
+    data = np.asarray(polylines, dtype=np.float64)
+    if len(data) == 0:
+        return []
+    keys = data[:, :2]
+    starts = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+    return [run for run in np.split(data[:, 2:4], starts) if len(run) > 1]
+
+class _Batch:
+    """Points of every stroke in one array; per-stroke sums go through np.add.reduceat."""
+
+    def __init__(self, strokes):
+        self.counts = np.array([len(stroke) for stroke in strokes])
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.points = np.concatenate(strokes)
+        self.mean = self.sum(self.points) / self.counts[:, None]
+        self.centered = self.points - self.spread(self.mean)
+
+    def sum(self, values):
+        return np.add.reduceat(values, self.starts, axis=0)
+
+    def spread(self, values):
+        return np.repeat(values, self.counts, axis=0)
+
+    def rms(self, residuals):
+        return np.sqrt(self.sum(residuals ** 2) / self.counts)
+
+def _outer_sums(batch, a, b):
+    return batch.sum(np.einsum('ni,nj->nij', a, b).reshape(len(a), -1)).reshape(-1, a.shape[1], b.shape[1])
+
+def fit_lines(batch):
+    """Total least squares line of each stroke: center, unit direction, RMS distance and extent along it."""
+    x, y = batch.centered.T
+    xx, yy, xy = (batch.sum(np.column_stack((x * x, y * y, x * y))) / batch.counts[:, None]).T
+    angle = 0.5 * np.arctan2(2 * xy, xx - yy)
+    direction = np.column_stack((np.cos(angle), np.sin(angle)))
+    minor = (xx + yy) / 2 - np.hypot((xx - yy) / 2, xy)
+    along = np.einsum('ij,ij->i', batch.centered, batch.spread(direction))
+    start = np.minimum.reduceat(along, batch.starts)
+    stop = np.maximum.reduceat(along, batch.starts)
+    return batch.mean, direction, np.sqrt(np.maximum(minor, 0)), start, stop
+
+def fit_circles(batch):
+    """Algebraic (Kasa) circle of each stroke: center, radius and RMS radial residual."""
+    x, y = batch.centered.T
+    design = np.column_stack((x, y, np.ones_like(x)))
+    z = (x * x + y * y)[:, None]
+    solution = np.linalg.pinv(_outer_sums(batch, design, design)) @ -_outer_sums(batch, design, z)
+    d, e, f = solution[:, :, 0].T
+    offset = np.column_stack((-d / 2, -e / 2))
+    with np.errstate(invalid='ignore'):
+        radius = np.sqrt(d * d / 4 + e * e / 4 - f)
+    residual = np.hypot(*(batch.centered - batch.spread(offset)).T) - batch.spread(radius)
+    return batch.mean + offset, radius, batch.rms(residual)
+
+def fit_ellipses(batch):
+    """
+    Direct least squares ellipse of each stroke (Fitzgibbon, in the
+    numerically stable form of Halir and Flusser): center, semi-axes,
+    angle of the first semi-axis and RMS Sampson distance. Strokes with
+    no ellipse solution get NaNs.
+    """
+    scale = np.sqrt(batch.sum(np.sum(batch.centered ** 2, axis=1)) / batch.counts)
+    scale[scale == 0] = 1
+    x, y = (batch.centered / batch.spread(scale)[:, None]).T
+    quadratic = np.column_stack((x * x, x * y, y * y))
+    linear = np.column_stack((x, y, np.ones_like(x)))
+    s1 = _outer_sums(batch, quadratic, quadratic)
+    s2 = _outer_sums(batch, quadratic, linear)
+    s3 = _outer_sums(batch, linear, linear)
+    t = -np.linalg.pinv(s3) @ np.swapaxes(s2, 1, 2)
+    m = s1 + s2 @ t
+    m = np.stack((m[:, 2] / 2, -m[:, 1], m[:, 0] / 2), axis=1)
+
+    _, vectors = np.linalg.eig(m)
+    vectors = vectors.real
+    valid = 4 * vectors[:, 0, :] * vectors[:, 2, :] - vectors[:, 1, :] ** 2 > 0
+    quadratic_part = vectors[np.arange(len(m)), :, np.argmax(valid, axis=1)]
+    quadratic_part[~valid.any(axis=1)] = np.nan
+    linear_part = (t @ quadratic_part[:, :, None])[:, :, 0]
+    a, b, c = quadratic_part.T
+    d, e, f = linear_part.T
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        den = b * b - 4 * a * c
+        cx = (2 * c * d - b * e) / den
+        cy = (2 * a * e - b * d) / den
+        num = 2 * (a * e * e + c * d * d - b * d * e + den * f)
+        root = np.hypot(a - c, b)
+        first = -np.sqrt(num * (a + c + root)) / den
+        second = -np.sqrt(num * (a + c - root)) / den
+        angle = 0.5 * np.arctan2(-b, c - a)
+
+        ca, cb, cc, cd, ce, cf = batch.spread(np.column_stack((a, b, c, d, e, f))).T
+        value = ca * x * x + cb * x * y + cc * y * y + cd * x + ce * y + cf
+        gradient = np.hypot(2 * ca * x + cb * y + cd, cb * x + 2 * cc * y + ce)
+        sampson = value / gradient
+
+    center = batch.mean + np.column_stack((cx, cy)) * scale[:, None]
+    return center, first * scale, second * scale, angle, batch.rms(sampson) * scale
+
+def _closed(stroke):
+    length = np.hypot(*np.diff(stroke, axis=0).T).sum()
+    return length > 0 and np.hypot(*(stroke[-1] - stroke[0])) <= CLOSED_TOLERANCE * length
+
+def _closed_outline(vertices):
+    return np.vstack((vertices, vertices[:1]))
+
+def _corner_angles(vertices):
+    before = np.roll(vertices, 1, axis=0) - vertices
+    after = np.roll(vertices, -1, axis=0) - vertices
+    cosine = np.einsum('ij,ij->i', before, after) / (np.hypot(*before.T) * np.hypot(*after.T))
+    return np.degrees(np.arccos(np.clip(cosine, -1, 1)))
+
+def fit_rectangle(stroke, corners):
+    """
+    Least squares rectangle through a closed stroke: one orientation from
+    the length-weighted directions of all its segments (mod 90 degrees),
+    then each side at the mean offset of the points closest to it.
+    """
+    segments = np.diff(stroke, axis=0)
+    weights = np.hypot(*segments.T)
+    angle = np.angle(np.sum(weights * np.exp(4j * np.arctan2(segments[:, 1], segments[:, 0])))) / 4
+    frame = np.array([[np.cos(angle), np.sin(angle)], [-np.sin(angle), np.cos(angle)]])
+    local = stroke @ frame.T
+    corners = corners @ frame.T
+
+    # Side k is the line u = sides[0], u = sides[1], v = sides[2] or v = sides[3]
+    sides = np.concatenate((corners.min(axis=0), corners.max(axis=0)))[[0, 2, 1, 3]]
+    coordinate = np.array([0, 0, 1, 1])
+    for _ in range(2):
+        nearest = np.argmin(np.abs(local[:, coordinate] - sides), axis=1)
+        for k in range(4):
+            mask = nearest == k
+            if mask.any():
+                sides[k] = local[mask, coordinate[k]].mean()
+    box = np.array([[sides[0], sides[2]], [sides[1], sides[2]], [sides[1], sides[3]], [sides[0], sides[3]]])
+    return box @ frame
+
+def fit_regular_polygon(stroke, vertices):
+    """
+    Regular polygon with as many vertices as the approximation: centered
+    on the stroke's perimeter centroid, with the mean vertex radius and
+    the rotation that best matches all vertices at once.
+    """
+    n = len(vertices)
+    center = outline_centroid(stroke)
+    offsets = vertices - center
+    radius = np.hypot(*offsets.T).mean()
+    angles = np.arctan2(offsets[:, 1], offsets[:, 0])
+    phase = np.angle(np.sum(np.exp(1j * n * angles))) / n
+
+    # Start next to the first vertex and go round the same way as the stroke
+    step = 2 * np.pi / n
+    x, y = offsets.T
+    direction = 1 if np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) >= 0 else -1
+    start = phase + step * np.round((angles[0] - phase) / step)
+    angles = start + direction * step * np.arange(n)
+    return center + radius * np.column_stack((np.cos(angles), np.sin(angles)))
+
+def _axes_through(outline, center, angles):
+    """Axes through center at the given angles, spanning the outline along each."""
+    directions = np.column_stack((np.cos(angles), np.sin(angles)))
+    along = (outline - center) @ directions.T
+    return [np.array([center + along[:, k].min() * d, center + along[:, k].max() * d])
+            for k, d in enumerate(directions)]
+
+def polygon_axes(vertices, threshold=SYMMETRY_THRESHOLD):
+    """
+    Reflection axes of a convex polygon. An axis maps vertices onto
+    vertices, so it runs from the centroid through a vertex or an edge
+    midpoint; each of those 2n candidates is scored by the mean distance
+    from the reflected vertices to the nearest vertex, relative to the
+    polygon's spread across its narrower principal axis as in
+    detect_symmetry. Axes closer together than pi / 2n are the same axis
+    found twice, and only the better one is kept.
+    """
+    n = len(vertices)
+    center = outline_centroid(vertices)
+    offsets = vertices - center
+    through = np.vstack((offsets, (offsets + np.roll(offsets, -1, axis=0)) / 2))
+    length = np.hypot(*through.T)
+    through, length = through[length > 0], length[length > 0]
+    directions = through / length[:, None]
+
+    projections = offsets @ directions.T
+    reflected = 2 * projections.T[:, :, None] * directions[:, None, :] - offsets
+    gaps = np.hypot(*(reflected[:, :, None, :] - offsets).transpose(3, 0, 1, 2))
+    errors = gaps.min(axis=2).mean(axis=1)
+
+    xx, yy = np.mean(offsets ** 2, axis=0)
+    xy = np.mean(offsets[:, 0] * offsets[:, 1])
+    minor = (xx + yy) / 2 - np.hypot((xx - yy) / 2, xy)
+    tolerance = threshold * np.sqrt(2 * max(minor, 0))
+
+    kept = []
+    angles = np.mod(np.arctan2(directions[:, 1], directions[:, 0]), np.pi)
+    for k in np.argsort(errors):
+        if errors[k] >= tolerance:
+            break
+        gap = np.abs(angles[kept] - angles[k])
+        if np.all(np.minimum(gap, np.pi - gap) > np.pi / (2 * n)):
+            kept.append(k)
+    return _axes_through(vertices, center, angles[kept])
+
+def _polygon(stroke):
+    perimeter = cv.arcLength(stroke.astype(np.float32), True)
+    approx = cv.approxPolyDP(stroke.astype(np.float32), POLYGON_EPSILON * perimeter, True)
+    vertices = approx.reshape(-1, 2).astype(np.float64)
+    n = len(vertices)
+    if n < 3 or n not in POLYGON_NAMES or not cv.isContourConvex(approx):
+        return FittedShape(UNIDENTIFIED, stroke)
+
+    if n == 4 and np.all(np.abs(_corner_angles(vertices) - 90) <= RIGHT_ANGLE_TOLERANCE):
+        box = fit_rectangle(stroke, vertices)
+        return FittedShape("rectangle", _closed_outline(box), polygon_axes(box))
+
+    sides = np.hypot(*(np.roll(vertices, -1, axis=0) - vertices).T)
+    radii = np.hypot(*(vertices - outline_centroid(stroke)).T)
+    if sides.std() <= REGULAR_TOLERANCE * sides.mean() and radii.std() <= REGULAR_TOLERANCE * radii.mean():
+        vertices = fit_regular_polygon(stroke, vertices)
+    return FittedShape(POLYGON_NAMES[n], _closed_outline(vertices), polygon_axes(vertices))
+
+def _circle(center, radius):
+    x, y = center
+    axes = [np.array([[x - radius, y], [x + radius, y]]), np.array([[x, y - radius], [x, y + radius]])]
+    return FittedShape("circle", circle_polyline(center, radius), axes)
+
+def _ellipse(center, first, second, angle):
+    rotation = complex(np.cos(angle), np.sin(angle))
+    outline = sample_arc(complex(*center), first, second, 0, 360, rotation)
+    u = np.array([rotation.real, rotation.imag])
+    v = np.array([-rotation.imag, rotation.real])
+    axes = [np.array([center - first * u, center + first * u]), np.array([center - second * v, center + second * v])]
+    return FittedShape("ellipse", outline, axes)
+
+def regularize_strokes(strokes):
+    """
+    Fit every stroke directly on its float points, with no rasterization.
+
+    Lines, circles and ellipses are least-squares fits computed for all
+    strokes at once; closed strokes that are none of these are
+    approximated by a polygon, which is snapped to a rectangle or a
+    regular polygon when it is close to one. Anything else is kept as
+    drawn. Circles and ellipses get their principal axes, polygons their
+    reflection axes. Returns one FittedShape per stroke.
+    """
+    if not strokes:
+        return []
+    batch = _Batch(strokes)
+    centers, directions, line_rms, start, stop = fit_lines(batch)
+    circle_centers, radii, circle_rms = fit_circles(batch)
+    ellipse_centers, first, second, angles, ellipse_rms = fit_ellipses(batch)
+    mean_radius = np.sqrt(np.abs(first * second))
+
+    shapes = []
+    for i, stroke in enumerate(strokes):
+        if not _closed(stroke):
+            length = stop[i] - start[i]
+            if length > 0 and line_rms[i] <= LINE_TOLERANCE * length:
+                shapes.append(FittedShape("line", centers[i] + np.outer([start[i], stop[i]], directions[i])))
+            else:
+                shapes.append(FittedShape(UNIDENTIFIED, stroke))
+        elif radii[i] > 0 and circle_rms[i] <= CIRCLE_TOLERANCE * radii[i]:
+            shapes.append(_circle(circle_centers[i], radii[i]))
+        elif mean_radius[i] > 0 and ellipse_rms[i] <= ELLIPSE_TOLERANCE * mean_radius[i]:
+            shapes.append(_ellipse(ellipse_centers[i], first[i], second[i], angles[i]))
+        else:
+            shapes.append(_polygon(stroke))
+    return shapes
+
+def regularize_polylines(polylines):
+    return regularize_strokes(split_strokes(polylines))
+
+def _color(label):
+    if label == "rectangle":
+        return RECTANGLE_COLOR
+    if label in ("circle", "ellipse"):
+        return ROUND_COLOR
+    if label == "line":
+        return LINE_COLOR
+    return SHAPE_COLORS.get(label, UNIDENTIFIED_COLOR)
+
+def draw_shapes(shapes, transform):
+    """Output image of fitted shapes: one cv.polylines call per colour."""
+    img = np.zeros(transform.shape + (3,), dtype=np.uint8)
+    by_color = {}
+    for shape in shapes:
+        by_color.setdefault(_color(shape.label), []).append(shape.outline)
+        by_color.setdefault(AXIS_COLOR, []).extend(shape.axes)
+    for color, polylines in by_color.items():
+        runs = [np.rint(transform.to_canvas(p)).astype(np.int32) for p in polylines]
+        if runs:
+            cv.polylines(img, runs, isClosed=False, color=color, thickness=1)
+    return img
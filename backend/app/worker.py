@@ -0,0 +1,20 @@
+from .config import Config
+
+# Entry points of the job pool processes. They only need the pipeline,
+# never Flask or the routes, so nothing here builds the app.
+
+def init_worker():
+    """Pool initializer: load the pipeline, warm it up if WARM_START is set, before the first job."""
+    from . import pipeline
+
+    if Config.WARM_START:
+        pipeline.warm_up()
+
+def run_job(db_path, job_id, data, filename, engine):
+    """Process one upload in a pool process; the parent stores the returned artifacts."""
+    from .jobs import JobStore
+    from .pipeline import process_upload
+
+    JobStore(db_path).mark_running(job_id)
+    # The encoded images are memoryviews, which can't be pickled back to the parent
+    return {name: bytes(data) for name, data in process_upload(data, filename, engine).items()}
@@ -0,0 +1,60 @@
+import time
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+# PNGs are already deflate-compressed; compressing them again costs CPU for nothing.
+STORED_EXTENSIONS = ('.png',)
+
+class _ChunkBuffer:
+    """Write-only, unseekable sink that zipfile writes into and the generator drains."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        # Stored members arrive as slices of the caller's buffer, which
+        # stays unchanged until drain() joins them; no need to copy here
+        self._chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def compression_for(name):
+    return zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+
+def stream_zip(members, chunk_size=CHUNK_SIZE):
+    """
+    Generate a ZIP archive chunk by chunk from (name, data) pairs.
+
+    Members are pulled from the iterable only when the previous one has
+    been written, and each is fed through zipfile in chunk_size slices,
+    so only one compressed chunk is buffered at a time. Because the sink
+    is unseekable, zipfile writes sizes in data descriptors after each
+    member instead of seeking back to the local header.
+    """
+    sink = _ChunkBuffer()
+    with zipfile.ZipFile(sink, 'w') as zf:
+        for name, data in members:
+            view = memoryview(data)
+            info = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+            info.compress_type = compression_for(name)
+            info.file_size = len(view)
+            with zf.open(info, 'w') as dest:
+                for start in range(0, len(view), chunk_size):
+                    dest.write(view[start:start + chunk_size])
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
@@ -0,0 +1,36 @@
+import glob
+import os
+
+import numpy as np
+import cv2 as cv
+import pytest
+
+from synthetic import generate_drawing
+
+from app.pipeline import compose_shapes, process_upload, shape_classifier
+from app.rasterize import fit_canvas, rasterize_polylines
+
+# Output images of the examples as the pipeline drew them, one OpenCV call
+# per primitive, before the composite batched its draw calls
+TESTS = os.path.dirname(os.path.abspath(__file__))
+REFERENCES = os.path.join(TESTS, "data")
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(TESTS)), "examples")
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(EXAMPLES, "*.csv"))), ids=os.path.basename)
+def test_output_image_matches_reference(path):
+    with open(path, 'rb') as f:
+        artifacts = process_upload(f.read(), os.path.basename(path))
+    output = cv.imdecode(np.frombuffer(artifacts['output_image.png'], np.uint8), cv.IMREAD_COLOR)
+    name = os.path.splitext(os.path.basename(path))[0]
+    reference = cv.imread(os.path.join(REFERENCES, f"{name}.png"), cv.IMREAD_COLOR)
+    np.testing.assert_array_equal(output, reference)
+
+@pytest.mark.parametrize("shapes", [50, 300])
+def test_batched_render_matches_per_primitive(shapes):
+    drawing = generate_drawing(shapes, 100, 0.01, 0.3, seed=shapes)
+    img = rasterize_polylines(drawing, fit_canvas(drawing))
+    _, binary = cv.threshold(img, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+    contours, _ = cv.findContours(binary, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+    composite = compose_shapes(shape_classifier.classify(contours))[0]
+    base = cv.cvtColor(img, cv.COLOR_GRAY2RGB)
+    np.testing.assert_array_equal(composite.render(base.copy()), composite.render_each(base.copy()))
@@ -0,0 +1,62 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+
+from app.ingest import IngestError, encode_f32, parse_csv, parse_polylines
+
+ROWS = np.array([[0, 0, 1.5, 2.0], [0, 0, 3.0, 4.5], [1, 0, 10.0, 12.0]])
+
+def npy_bytes(array):
+    buffer = BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+def csv_bytes(rows):
+    return "".join(",".join(str(v) for v in row) + "\n" for row in rows).encode()
+
+@pytest.mark.parametrize("data, filename", [
+    (csv_bytes(ROWS), "drawing.csv"),
+    (npy_bytes(ROWS), "drawing.npy"),
+    (encode_f32(ROWS), "drawing.f32"),
+], ids=["csv", "npy", "f32"])
+def test_formats_parse_to_the_same_rows(data, filename):
+    points = parse_polylines(data, filename)
+    assert points.dtype.kind == 'f' and points.flags.c_contiguous
+    np.testing.assert_array_equal(points, ROWS)
+
+def test_integer_npy_is_converted_to_float():
+    points = parse_polylines(npy_bytes(np.rint(ROWS).astype(np.int32)), "drawing.npy")
+    assert points.dtype == np.float64
+    np.testing.assert_array_equal(points, np.rint(ROWS))
+
+def test_large_csv_goes_through_pandas_with_the_same_result():
+    data = csv_bytes(ROWS)
+    np.testing.assert_array_equal(parse_csv(data, loadtxt_max_bytes=0), parse_csv(data))
+
+@pytest.mark.parametrize("data", [b"", npy_bytes(ROWS)[:40], npy_bytes(ROWS)[:-8], b"\x93NUMPY\x01\x00garbage"],
+                         ids=["empty", "header", "truncated", "mangled"])
+def test_broken_npy_raises_ingest_error(data):
+    with pytest.raises(IngestError):
+        parse_polylines(data, "drawing.npy")
+
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf])
+@pytest.mark.parametrize("filename", ["drawing.csv", "drawing.npy", "drawing.f32"])
+def test_non_finite_coordinates_raise_ingest_error(value, filename):
+    rows = ROWS.copy()
+    rows[1, 2] = value
+    data = {"drawing.csv": csv_bytes, "drawing.npy": npy_bytes, "drawing.f32": encode_f32}[filename](rows)
+    with pytest.raises(IngestError, match="row 2"):
+        parse_polylines(data, filename)
+
+@pytest.mark.parametrize("data, filename", [
+    (npy_bytes(np.array([["a", "b", "c", "d"]])), "drawing.npy"),
+    (npy_bytes(ROWS[:, :3]), "drawing.npy"),
+    (b"1,2,x,4\n", "drawing.csv"),
+    (b"1,2,3\n", "drawing.csv"),
+    (encode_f32(ROWS)[:-4], "drawing.f32"),
+    (b"", "drawing.txt"),
+], ids=["strings", "three-columns", "text", "short-row", "short-f32", "extension"])
+def test_malformed_uploads_raise_ingest_error(data, filename):
+    with pytest.raises(IngestError):
+        parse_polylines(data, filename)
@@ -0,0 +1,81 @@
+import numpy as np
+import cv2 as cv
+import pytest
+
+from app.sessions import DrawingSession, SessionError, stroke_points
+from app.shapes import ShapeClassifier
+
+classifier = ShapeClassifier()
+# A smaller canvas than the default keeps the full recomputes quick
+MAX_PIXELS = 1024 * 1024
+
+def polygon(sides, cx, cy, radius, phase=0.3):
+    t = np.linspace(0, 2 * np.pi, sides + 1) + phase
+    return np.column_stack((cx + radius * np.cos(t), cy + radius * np.sin(t)))
+
+def outline(polyline):
+    # Symmetry axes come out in either direction
+    forward, backward = (tuple(np.round(p, 6).ravel()) for p in (polyline, polyline[::-1]))
+    return min(forward, backward)
+
+def summary(shapes):
+    """Shapes as comparable tuples; the axes of a shape may come in any order."""
+    return sorted((shape.label, tuple(int(v) for v in shape.box), tuple(sorted(map(outline, shape.polylines))))
+                  for shape in shapes)
+
+def recompute(session):
+    """Every shape of the session's strokes, found over the whole canvas at once."""
+    full = DrawingSession(classifier, MAX_PIXELS)
+    full.strokes = dict(session.strokes)
+    full.transform = session.transform
+    full.img = np.zeros(session.transform.shape, dtype=np.uint8)
+    full._draw(full.strokes)
+    contours, _ = cv.findContours(full.img, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+    full._add_shapes(contours)
+    return full
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_incremental_edits_match_full_recompute(seed):
+    rng = np.random.default_rng(seed)
+    session = DrawingSession(classifier, MAX_PIXELS)
+    strokes = {}
+    for _ in range(60):
+        if strokes and rng.random() < 0.3:
+            key = str(rng.choice(list(strokes)))
+            del strokes[key]
+            delta = session.update(remove=[key])
+        else:
+            # Ids are reused, so some edits replace a stroke in place
+            key = str(rng.integers(0, 60))
+            strokes[key] = polygon(int(rng.choice([3, 4, 40])), *rng.uniform(50, 950, 2), rng.uniform(10, 60))
+            delta = session.update(add={key: strokes[key]})
+        if session.transform is None:
+            continue
+
+        full = recompute(session)
+        np.testing.assert_array_equal(session.img, full.img)
+        assert summary(session.shapes.values()) == summary(full.shapes.values())
+        assert not set(delta['removed']) & set(session.shapes)
+
+def test_stroke_leaving_the_canvas_rebuilds():
+    session = DrawingSession(classifier)
+    assert session.update(add={"a": polygon(4, 100, 100, 30)})['rebuilt']
+    assert not session.update(add={"b": polygon(3, 150, 120, 20)})['rebuilt']
+    delta = session.update(add={"c": polygon(40, 5000, 5000, 40)})
+    assert delta['rebuilt']
+    assert summary(session.shapes.values()) == summary(recompute(session).shapes.values())
+
+def test_removing_every_stroke_clears_the_canvas():
+    session = DrawingSession(classifier)
+    session.update(add={"a": polygon(4, 100, 100, 30)})
+    delta = session.update(remove=["a"])
+    assert delta['removed'] and not session.shapes
+    assert not session.img.any()
+
+@pytest.mark.parametrize("points", ["abc", 5, {"x": 1}, [[1, 2, 3]], [[1, float("nan")]], [["a", "b"]]])
+def test_invalid_strokes_raise_session_errors(points):
+    with pytest.raises(SessionError):
+        stroke_points(points)
+
+def test_point_objects_are_accepted():
+    np.testing.assert_array_equal(stroke_points([{"x": 1, "y": 2}, {"x": 3, "y": 4}]), [[1, 2], [3, 4]])
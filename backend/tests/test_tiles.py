@@ -0,0 +1,39 @@
+import numpy as np
+import cv2 as cv
+import pytest
+
+from synthetic import generate_drawing
+
+from app.rasterize import fit_canvas, rasterize_polylines
+from app.tiles import find_contours_tiled
+
+def assert_same_contours(binary, tile):
+    contours, hierarchy = cv.findContours(binary, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+    tiled, tiled_hierarchy = find_contours_tiled(binary, tile=tile)
+    assert len(tiled) == len(contours)
+    for expected, actual in zip(contours, tiled):
+        np.testing.assert_array_equal(actual, expected)
+    np.testing.assert_array_equal(tiled_hierarchy, hierarchy)
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("tile", [64, 128, 512])
+def test_tiled_contours_match_whole_canvas(seed, tile):
+    # Occluded, noisy shapes on a 1024 px canvas, so many cross tile borders
+    drawing = generate_drawing(100, 100, 0.01, 0.3, seed=seed)
+    binary = rasterize_polylines(drawing, fit_canvas(drawing, 1024 * 1024))
+    assert_same_contours(binary, tile)
+
+def test_tiled_contours_keep_nesting_across_tiles():
+    # Rings inside rings, each crossing the borders of several tiles
+    binary = np.zeros((600, 600), dtype=np.uint8)
+    for radius in range(40, 290, 25):
+        cv.circle(binary, (300, 300), radius, 255, 1)
+    cv.rectangle(binary, (10, 10), (590, 590), 255, 1)
+    cv.line(binary, (0, 599), (599, 0), 255, 1)
+    assert_same_contours(binary, 64)
+
+def test_tiled_contours_of_empty_canvas():
+    binary = np.zeros((256, 256), dtype=np.uint8)
+    contours, hierarchy = find_contours_tiled(binary, tile=64)
+    assert len(contours) == 0
+    assert hierarchy is None
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import cv2 as cv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from synthetic import KINDS, generate_drawing
+
+from app.rasterize import fit_canvas, rasterize_polylines
+from app.shapes import CLASSIFIERS, TemplateShapeClassifier
+from app.templates import build_library
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def outer_kinds(contours, hierarchy, transform, columns, size):
+    """Drawn kind of every top-level contour, from the grid cell its points are centred in."""
+    kinds = {}
+    for i, contour in enumerate(contours):
+        if hierarchy[0, i, 3] == -1:
+            x, y = transform.to_drawing(contour.reshape(-1, 2).mean(axis=0))
+            kinds[i] = KINDS[(int(y // size) * columns + int(x // size)) % len(KINDS)]
+    return kinds
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the shape classifiers and score them on synthetic drawings.")
+    parser.add_argument("--shapes", type=int, default=400)
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.01, 0.02])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # The template library is built in memory rather than at SHAPE_LIBRARY
+    classifiers = {name: TemplateShapeClassifier(build_library()) if classifier_type is TemplateShapeClassifier
+                   else classifier_type() for name, classifier_type in CLASSIFIERS.items()}
+
+    size = 100.0
+    columns = max(int(np.ceil(np.sqrt(args.shapes))), 1)
+    for noise in args.noise:
+        drawing = generate_drawing(args.shapes, 100, noise, 0.0, size=size, seed=0)
+        transform = fit_canvas(drawing)
+        binary = rasterize_polylines(drawing, transform)
+        contours, hierarchy = cv.findContours(binary, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+        kinds = outer_kinds(contours, hierarchy, transform, columns, size)
+
+        print(f"noise {noise}: {len(contours)} contours, {len(kinds)} top-level")
+        print(f"{'classifier':<12}{'ms':>8}" + "".join(f"{kind:>10}" for kind in KINDS))
+        for name, classifier in classifiers.items():
+            seconds, shapes = best_of(args.repeat, lambda: classifier.classify(contours))
+            drawn = Counter(kinds.values())
+            correct = Counter(kind for i, kind in kinds.items() if shapes[i].label == kind)
+            print(f"{name:<12}{seconds * 1e3:>8.1f}"
+                  + "".join(f"{correct[kind] / drawn[kind]:>10.0%}" for kind in KINDS))
+        print()
+
+if __name__ == "__main__":
+    main()
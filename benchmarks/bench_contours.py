@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import cv2 as cv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from synthetic import generate_drawing
+
+from app import tiles
+from app.config import Config
+from app.pipeline import shape_classifier
+from app.rasterize import fit_canvas, rasterize_polylines
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def same_contours(expected, actual):
+    (contours, hierarchy), (tiled, tiled_hierarchy) = expected, actual
+    return (len(contours) == len(tiled)
+            and all(np.array_equal(a, b) for a, b in zip(contours, tiled))
+            and (hierarchy is None) == (tiled_hierarchy is None)
+            and (hierarchy is None or np.array_equal(hierarchy, tiled_hierarchy)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare whole-canvas and tiled contour detection.")
+    parser.add_argument("--sides", type=int, nargs="+", default=[2048, 4096, 8192], help="canvas sides in pixels")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--cell", type=float, default=100.0, help="grid cell of one synthetic shape, in pixels")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'canvas':>11}{'contours':>10}{'workers':>9}{'contours ms':>13}{'classify ms':>13}{'speedup':>9}")
+    for side in args.sides:
+        shapes = int((side / args.cell) ** 2)
+        drawing = generate_drawing(shapes, 100, 0.01, 0.3, size=args.cell, seed=side)
+        binary = rasterize_polylines(drawing, fit_canvas(drawing, side * side * 2))
+
+        find_time, expected = best_of(args.repeat, lambda: cv.findContours(binary, cv.RETR_TREE,
+                                                                             cv.CHAIN_APPROX_SIMPLE))
+        classify_time, _ = best_of(args.repeat, lambda: shape_classifier.classify(expected[0]))
+        canvas = f"{binary.shape[1]}x{binary.shape[0]}"
+        print(f"{canvas:>11}{len(expected[0]):>10}{'whole':>9}{find_time * 1e3:>13.1f}{classify_time * 1e3:>13.1f}"
+              f"{1.0:>9.2f}")
+
+        for workers in args.workers:
+            # The pool is sized on first use, so drop it to pick up the new worker count
+            Config.CONTOUR_WORKERS = workers
+            tiles._pool = None
+            tiled_time, actual = best_of(args.repeat, lambda: tiles.find_contours_tiled(binary))
+            if not same_contours(expected, actual):
+                raise SystemExit(f"Tiled contours differ from findContours on {canvas} with {workers} workers")
+            tiled_classify, _ = best_of(args.repeat, lambda: tiles.classify_tiled(shape_classifier, actual[0]))
+            speedup = (find_time + classify_time) / (tiled_time + tiled_classify)
+            print(f"{'':>11}{'':>10}{workers:>9}{tiled_time * 1e3:>13.1f}{tiled_classify * 1e3:>13.1f}{speedup:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import glob
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.app.ingest import LOADTXT_MAX_BYTES, encode_f32, parse_csv, parse_polylines
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def encode_npy(points):
+    buffer = io.BytesIO()
+    np.save(buffer, points)
+    return buffer.getvalue()
+
+def bench(label, csv_bytes, repeat):
+    legacy_time, frame = best_of(lambda: pd.read_csv(io.BytesIO(csv_bytes), header=None), repeat)
+    # Both CSV paths on every input, whichever one parse_polylines would pick
+    loadtxt_time, loaded = best_of(lambda: parse_csv(csv_bytes, loadtxt_max_bytes=float('inf')), repeat)
+    pandas_time, parsed = best_of(lambda: parse_csv(csv_bytes, loadtxt_max_bytes=0), repeat)
+    csv_time, points = best_of(lambda: parse_polylines(csv_bytes, 'upload.csv'), repeat)
+    # pandas' default float parser can be one ulp off; loadtxt rounds correctly
+    for result in (loaded, parsed, points):
+        if not np.allclose(frame.to_numpy(), result, rtol=1e-15, atol=0):
+            raise SystemExit(f"Parsed values differ for {label}")
+
+    npy_bytes = encode_npy(points)
+    f32_bytes = encode_f32(points)
+    npy_time, _ = best_of(lambda: parse_polylines(npy_bytes, 'upload.npy'), repeat)
+    f32_time, _ = best_of(lambda: parse_polylines(f32_bytes, 'upload.f32'), repeat)
+
+    path = 'loadtxt' if len(csv_bytes) <= LOADTXT_MAX_BYTES else 'pandas'
+    print(f"{label:<24}{len(points):>8}{legacy_time * 1e3:>12.2f}{loadtxt_time * 1e3:>12.2f}"
+          f"{pandas_time * 1e3:>11.2f}{csv_time * 1e3:>10.2f} {path:<8}"
+          f"{npy_time * 1e3:>9.3f}{f32_time * 1e3:>10.3f}"
+          f"{len(csv_bytes) // 1024:>9}K{len(npy_bytes) // 1024:>7}K{len(f32_bytes) // 1024:>7}K")
+
+def main(repeat=5, scale=50):
+    print(f"{'input':<24}{'rows':>8}{'read_csv ms':>12}{'loadtxt ms':>12}{'pandas ms':>11}{'csv ms':>10} {'path':<8}"
+          f"{'npy ms':>9}{'f32 ms':>10}{'csv':>10}{'npy':>8}{'f32':>8}")
+    paths = sorted(glob.glob(os.path.join(ROOT, 'examples', '*.csv')))
+    everything = b''
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        everything += data
+        bench(os.path.basename(path), data, repeat)
+    for times in (5, scale):
+        bench(f"all examples x{times}", everything * times, repeat)
+
+if __name__ == "__main__":
+    main()
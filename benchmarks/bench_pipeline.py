@@ -0,0 +1,197 @@
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_drawing, to_csv
+
+DEFAULT_SIZES = (10, 100, 1000)
+
+def summarize(samples, rows):
+    """Latency percentiles in milliseconds and throughput of one series of timings."""
+    samples = np.asarray(samples)
+    p50 = float(np.percentile(samples, 50))
+    return {
+        "p50_ms": p50 * 1e3,
+        "p99_ms": float(np.percentile(samples, 99)) * 1e3,
+        "mean_ms": float(samples.mean()) * 1e3,
+        "runs": len(samples),
+        "points_per_s": rows / p50 if p50 > 0 else None,
+    }
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def bench_size(params, repeat):
+    """
+    Time one drawing size through every stage, both engines and the
+    /upload-csv route. Runs in its own interpreter, so the peak RSS is
+    this size's alone.
+    """
+    storage = tempfile.mkdtemp(prefix="bench-storage-")
+    # Config reads the environment on import: no result cache, local storage
+    os.environ.update(STORAGE_BACKEND="local", LOCAL_STORAGE_DIR=storage, RESULT_CACHE_BYTES="0")
+    os.environ.pop("RESULT_CACHE_DIR", None)
+    os.environ.pop("PROFILE_DIR", None)
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+    from app import create_app
+    from app.ingest import parse_polylines
+    from app.metrics import StageClock, end_request, start_request
+    from app.pipeline import process_csv_and_generate_image
+    from app.routes import upload_queue
+    from app.vector import ENGINES
+
+    drawing = generate_drawing(params["shapes"], params["points"], params["noise"], params["occlusion"],
+                               seed=params["seed"])
+    data = to_csv(drawing)
+    rows = len(drawing)
+    result = dict(params, rows=rows, csv_bytes=len(data), engines={}, route={})
+
+    for engine in ENGINES:
+        stages = {}
+        totals = []
+        for i in range(repeat + 1):
+            timings, token = start_request()
+            start = time.perf_counter()
+            try:
+                clock = StageClock()
+                polylines = parse_polylines(data, "bench.csv")
+                clock.lap("parse")
+                process_csv_and_generate_image(polylines, input_csv=data, engine=engine)
+            finally:
+                end_request(token)
+            # The first run warms up imports and caches
+            if i == 0:
+                continue
+            totals.append(time.perf_counter() - start)
+            for name, (seconds, _) in timings.stages.items():
+                stages.setdefault(name, []).append(seconds)
+        result["engines"][engine] = {
+            "total": summarize(totals, rows),
+            "stages": {name: summarize(samples, rows) for name, samples in stages.items()},
+        }
+
+    client = create_app(warm=False).test_client()
+    for engine in ENGINES:
+        totals = []
+        for i in range(repeat + 1):
+            start = time.perf_counter()
+            response = client.post(f"/upload-csv?engine={engine}",
+                                   data={"file": (io.BytesIO(data), "bench.csv")},
+                                   content_type="multipart/form-data")
+            response.get_data()
+            if response.status_code != 200:
+                raise RuntimeError(f"/upload-csv returned {response.status_code}: {response.get_data()[:200]}")
+            if i:
+                totals.append(time.perf_counter() - start)
+        result["route"][engine] = summarize(totals, rows)
+    upload_queue.join()
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+def run_isolated(params, repeat):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(params), "--repeat", str(repeat)]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=ROOT)
+    if completed.returncode != 0:
+        raise SystemExit(f"Benchmark of {params} failed:\n{completed.stderr}")
+    # create_app prints its CORS origin; the report is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def environment():
+    import cv2 as cv
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=ROOT).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def _key(result):
+    return (result["shapes"], result["points"], result["noise"], result["occlusion"], result["seed"])
+
+def compare(report, baseline, tolerance):
+    """p50 latencies that got slower than the baseline by more than tolerance."""
+    previous = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        series = [(f"route {engine}", result["route"][engine], old["route"].get(engine)) for engine in result["route"]]
+        series += [(f"{engine} total", result["engines"][engine]["total"], old["engines"].get(engine, {}).get("total"))
+                   for engine in result["engines"]]
+        for name, new, before in series:
+            if before and new["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+                regressions.append(f"{result['shapes']} shapes, {name}: "
+                                   f"{before['p50_ms']:.2f} -> {new['p50_ms']:.2f} ms p50")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic drawings of growing size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="shape counts to run")
+    parser.add_argument("--points", type=int, default=100, help="points per stroke")
+    parser.add_argument("--noise", type=float, default=0.01)
+    parser.add_argument("--occlusion", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per size")
+    parser.add_argument("-o", "--output", default="bench_report.json", help="JSON report to write")
+    parser.add_argument("--baseline", help="earlier report to compare p50 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown before failing")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(bench_size(json.loads(args.worker), args.repeat)))
+        return
+
+    report = {"environment": environment(), "repeat": args.repeat, "results": []}
+    print(f"{'shapes':>7}{'rows':>9}{'raster p50':>12}{'p99':>9}{'vector p50':>12}{'p99':>9}"
+          f"{'route p50':>11}{'Mpts/s':>8}{'RSS MB':>8}")
+    for shapes in args.sizes:
+        params = {"shapes": shapes, "points": args.points, "noise": args.noise,
+                  "occlusion": args.occlusion, "seed": args.seed}
+        result = run_isolated(params, args.repeat)
+        report["results"].append(result)
+        raster = result["engines"]["raster"]["total"]
+        vector = result["engines"]["vector"]["total"]
+        route = result["route"]["raster"]
+        print(f"{shapes:>7}{result['rows']:>9}{raster['p50_ms']:>12.2f}{raster['p99_ms']:>9.2f}"
+              f"{vector['p50_ms']:>12.2f}{vector['p99_ms']:>9.2f}{route['p50_ms']:>11.2f}"
+              f"{route['points_per_s'] / 1e6:>8.2f}{result['peak_rss_mb']:>8.0f}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
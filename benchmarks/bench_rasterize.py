@@ -0,0 +1,76 @@
+import glob
+import os
+import sys
+import time
+
+import cv2 as cv
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_drawing
+
+from backend.app.pipeline import compose_shapes, shape_classifier
+from backend.app.rasterize import fit_canvas, rasterize_polylines
+
+def legacy_rasterize(polylines):
+    # Row-by-row loop the pipeline used before the batched rasterizer.
+    img = np.zeros((512, 512), dtype=np.uint8)
+    current_polyline = None
+
+    for i in range(len(polylines)):
+        if [polylines.iloc[i, 0], polylines.iloc[i, 1]] != current_polyline:
+            current_polyline = [polylines.iloc[i, 0], polylines.iloc[i, 1]]
+        else:
+            pt1 = (int(round(polylines.iloc[i-1, 2])), int(round(polylines.iloc[i-1, 3])))
+            pt2 = (int(round(polylines.iloc[i, 2])), int(round(polylines.iloc[i, 3])))
+            cv.line(img, pt1, pt2, color=255, thickness=1)
+    return img
+
+def composite_of(polylines):
+    img = rasterize_polylines(polylines, fit_canvas(polylines))
+    _, binary = cv.threshold(img, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+    contours, _ = cv.findContours(binary, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+    composite = compose_shapes(shape_classifier.classify(contours))[0]
+    return composite, cv.cvtColor(img, cv.COLOR_GRAY2RGB)
+
+def best_of(fn, arg, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(repeat=5):
+    paths = sorted(glob.glob(os.path.join(ROOT, 'examples', '*.csv')))
+    print(f"{'file':<24}{'rows':>7}{'legacy ms':>12}{'batched ms':>12}{'speedup':>9}  identical")
+    for path in paths:
+        polylines = pd.read_csv(path, header=None)
+        legacy_time, legacy_img = best_of(legacy_rasterize, polylines, repeat)
+        batched_time, batched_img = best_of(rasterize_polylines, polylines, repeat)
+        identical = np.array_equal(legacy_img, batched_img)
+        print(f"{os.path.basename(path):<24}{len(polylines):>7}{legacy_time * 1e3:>12.2f}"
+              f"{batched_time * 1e3:>12.2f}{legacy_time / batched_time:>8.1f}x  {identical}")
+        if not identical:
+            raise SystemExit(f"Output mismatch for {path}")
+
+    drawings = [(os.path.basename(path), pd.read_csv(path, header=None).to_numpy()) for path in paths]
+    drawings += [(f"synthetic x{shapes}", generate_drawing(shapes, 100, 0.01, 0.3, seed=shapes)) for shapes in (200, 1000)]
+    print()
+    print(f"{'drawing':<24}{'layers':>7}{'each ms':>12}{'batched ms':>12}{'speedup':>9}  identical")
+    for name, polylines in drawings:
+        composite, img = composite_of(polylines)
+        each_time, each_img = best_of(lambda base: composite.render_each(base.copy()), img, repeat)
+        batched_time, batched_img = best_of(lambda base: composite.render(base.copy()), img, repeat)
+        identical = np.array_equal(each_img, batched_img)
+        print(f"{name:<24}{len(composite.layers):>7}{each_time * 1e3:>12.2f}"
+              f"{batched_time * 1e3:>12.2f}{each_time / batched_time:>8.1f}x  {identical}")
+        if not identical:
+            raise SystemExit(f"Composite mismatch for {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from app.spatial import LiveShapeIndex, ShapeIndex, boxes_intersect
+
+def random_boxes(count, rng, cell=100.0):
+    """count boxes of shape size (up to a cell) spread over a square holding one per cell."""
+    side = np.sqrt(count) * cell
+    lo = rng.uniform(0, side, (count, 2))
+    return np.hstack((lo, lo + rng.uniform(5, cell, (count, 2)))), side
+
+def timed(func, items):
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    return (time.perf_counter() - start) / len(items), results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ShapeIndex queries with a linear scan over every box.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'boxes':>8}{'build ms':>10}{'linear us':>11}{'index us':>10}{'speedup':>9}"
+          f"{'dict edit us':>14}{'live edit us':>14}{'speedup':>9}  identical")
+    for count in args.sizes:
+        boxes, side = random_boxes(count, rng)
+        lo = rng.uniform(0, side, (args.queries, 2))
+        queries = np.hstack((lo, lo + rng.uniform(5, 100, (args.queries, 2))))
+
+        start = time.perf_counter()
+        index = ShapeIndex(boxes)
+        build = time.perf_counter() - start
+        linear_time, expected = timed(lambda box: np.flatnonzero(boxes_intersect(boxes, box)), queries)
+        index_time, found = timed(index.query, queries)
+        identical = all(np.array_equal(a, b) for a, b in zip(expected, found))
+
+        # A live drawing: every edit replaces one box, then hit-tests it, as a
+        # session does; the baseline keeps the boxes in a dict and scans them all
+        live = LiveShapeIndex()
+        plain = {}
+        for key, box in enumerate(boxes):
+            live.add(key, box)
+            plain[key] = box
+        keys = rng.integers(0, count, args.queries)
+
+        def edit_live(i):
+            live.add(keys[i], queries[i])
+            return sorted(live.query(queries[i]))
+
+        def edit_plain(i):
+            plain[keys[i]] = queries[i]
+            ids = list(plain)
+            stacked = np.array(list(plain.values()))
+            return sorted(ids[j] for j in np.flatnonzero(boxes_intersect(stacked, queries[i])))
+
+        live_time, live_found = timed(edit_live, range(args.queries))
+        plain_time, plain_found = timed(edit_plain, range(args.queries))
+        identical = identical and live_found == plain_found
+
+        print(f"{count:>8}{build * 1e3:>10.1f}{linear_time * 1e6:>11.1f}{index_time * 1e6:>10.1f}"
+              f"{linear_time / index_time:>8.1f}x{plain_time * 1e6:>14.1f}{live_time * 1e6:>14.1f}"
+              f"{plain_time / live_time:>8.1f}x  {identical}")
+        if not identical:
+            raise SystemExit(f"Index results differ from the linear scan at {count} boxes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, "backend")
+
+# Seconds a worker may take from interpreter start to serving warm requests
+DEFAULT_BUDGET = 2.0
+
+# Runs in a fresh interpreter; prints the phase timings as the last line
+PROBE = """
+import io, json, time
+start = time.perf_counter()
+from app import create_app
+from app.pipeline import warm_up
+app = create_app(warm=False)
+created = time.perf_counter()
+warm_up()
+warmed = time.perf_counter()
+data = open({example!r}, 'rb').read()
+response = app.test_client().post('/upload-csv', data={{'file': (io.BytesIO(data), 'example.csv')}},
+                                  content_type='multipart/form-data')
+response.get_data()
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(json.dumps({{'create_app': created - start, 'warm_up': warmed - created, 'first_request': served - warmed}}))
+"""
+
+def probe(example, storage):
+    env = dict(os.environ, STORAGE_BACKEND="local", LOCAL_STORAGE_DIR=storage, RESULT_CACHE_DIR="", PROFILE_DIR="")
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", PROBE.format(example=example)],
+                               capture_output=True, text=True, cwd=BACKEND, env=env)
+    total = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise SystemExit(f"Startup probe failed:\n{completed.stderr}")
+    phases = json.loads(completed.stdout.strip().splitlines()[-1])
+    phases["process"] = total
+    return phases
+
+def slowest_imports(count):
+    """The count modules with the largest cumulative import time under create_app, from -X importtime."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "from app import create_app; create_app(warm=False)"],
+                               capture_output=True, text=True, cwd=BACKEND)
+    rows = []
+    for line in completed.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    # Only top-level packages, so a package and its submodules aren't listed twice
+    top = {}
+    for cumulative, name in rows:
+        package = name.split(".")[0]
+        top[package] = max(top.get(package, 0), cumulative)
+    return sorted(top.items(), key=lambda item: -item[1])[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend cold start in fresh interpreters.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="median seconds allowed from process start to the first warm request")
+    parser.add_argument("--imports", type=int, default=8, help="list this many slowest top-level imports")
+    parser.add_argument("--example", default=os.path.join(ROOT, "examples", "isolated.csv"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-storage-") as storage:
+        runs = [probe(os.path.abspath(args.example), storage) for _ in range(args.repeat)]
+    print(f"{'phase':<16}{'median ms':>10}{'max ms':>10}")
+    for phase in ("create_app", "warm_up", "first_request", "process"):
+        values = np.array([run[phase] for run in runs]) * 1e3
+        print(f"{phase:<16}{np.median(values):>10.1f}{values.max():>10.1f}")
+
+    if args.imports:
+        print("\nslowest imports (cumulative ms)")
+        for name, microseconds in slowest_imports(args.imports):
+            print(f"  {name:<24}{microseconds / 1e3:>8.1f}")
+
+    median = float(np.median([run["process"] for run in runs]))
+    if median > args.budget:
+        raise SystemExit(f"Cold start {median:.2f} s is over the {args.budget:.2f} s budget")
+    print(f"\nCold start {median:.2f} s within the {args.budget:.2f} s budget")
+
+if __name__ == "__main__":
+    main()
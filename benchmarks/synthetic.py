@@ -0,0 +1,107 @@
+import argparse
+import io
+import os
+
+import numpy as np
+
+# Shape kinds the generator draws, in the order they are cycled through
+KINDS = ("circle", "ellipse", "rectangle", "triangle", "pentagon", "hexagon", "star", "line")
+
+def _outline(kind, points, rng):
+    """Unit-sized outline of one shape as (points, 2), closed except for lines."""
+    t = np.linspace(0, 2 * np.pi, points)
+    if kind == "circle":
+        return np.column_stack((np.cos(t), np.sin(t)))
+    if kind == "ellipse":
+        ratio = rng.uniform(0.35, 0.8)
+        return np.column_stack((np.cos(t), ratio * np.sin(t)))
+    if kind == "line":
+        return np.column_stack((np.linspace(-1, 1, points), np.zeros(points)))
+
+    if kind == "rectangle":
+        ratio = rng.uniform(0.4, 1.0)
+        corners = np.array([[-1, -ratio], [1, -ratio], [1, ratio], [-1, ratio]])
+    elif kind == "star":
+        angles = np.arange(10) * np.pi / 5
+        radii = np.where(np.arange(10) % 2 == 0, 1.0, 0.4)
+        corners = np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))
+    else:
+        sides = {"triangle": 3, "pentagon": 5, "hexagon": 6}[kind]
+        angles = np.arange(sides) * 2 * np.pi / sides
+        corners = np.column_stack((np.cos(angles), np.sin(angles)))
+
+    # Walk the perimeter at an even pace, ending on the first corner again
+    closed = np.vstack((corners, corners[:1]))
+    distance = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(closed, axis=0).T))))
+    at = np.linspace(0, distance[-1], points)
+    return np.column_stack((np.interp(at, distance, closed[:, 0]), np.interp(at, distance, closed[:, 1])))
+
+def generate_drawing(shapes=20, points_per_stroke=100, noise=0.01, occlusion=0.0, size=100.0, seed=0):
+    """
+    Synthetic drawing in the four-column (path id, shape id, x, y) format.
+
+    Shapes of every kind in KINDS are laid out on a grid of size-wide
+    cells with a random rotation and scale. noise is the standard
+    deviation of the jitter added to every point, relative to the shape
+    size. occlusion is the fraction of shapes moved half over their left
+    neighbour with a stretch of their stroke missing, so the stroke
+    comes in two paths as in the occlusion examples. Returns a float64
+    (n, 4) array.
+    """
+    rng = np.random.default_rng(seed)
+    columns = max(int(np.ceil(np.sqrt(shapes))), 1)
+    rows = []
+    path_id = 0
+    for i in range(shapes):
+        kind = KINDS[i % len(KINDS)]
+        radius = size * rng.uniform(0.25, 0.4)
+        angle = rng.uniform(0, 2 * np.pi)
+        rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        center = (np.array([i % columns, i // columns]) + 0.5) * size
+
+        occluded = i % columns > 0 and rng.random() < occlusion
+        if occluded:
+            center[0] -= size / 2
+
+        points = _outline(kind, points_per_stroke, rng) @ rotation.T * radius + center
+        points += rng.normal(scale=noise * radius, size=points.shape)
+
+        strokes = [points]
+        if occluded:
+            start = rng.integers(points_per_stroke)
+            gap = max(points_per_stroke // 6, 1)
+            keep = np.roll(np.arange(points_per_stroke), -start)[gap:]
+            strokes = [stroke for stroke in np.split(points[keep], [len(keep) // 2]) if len(stroke) > 1]
+
+        for stroke in strokes:
+            ids = np.full((len(stroke), 1), path_id, dtype=np.float64)
+            rows.append(np.hstack((ids, np.zeros_like(ids), stroke)))
+            path_id += 1
+    if not rows:
+        return np.empty((0, 4))
+    return np.concatenate(rows)
+
+def to_csv(drawing):
+    """CSV bytes of a drawing, written with np.savetxt like the examples."""
+    buffer = io.BytesIO()
+    np.savetxt(buffer, drawing, delimiter=",")
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic four-column polyline CSVs.")
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--shapes", type=int, default=20)
+    parser.add_argument("--points", type=int, default=100, help="points per stroke")
+    parser.add_argument("--noise", type=float, default=0.01, help="jitter relative to shape size")
+    parser.add_argument("--occlusion", type=float, default=0.0, help="fraction of overlapping, broken shapes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    drawing = generate_drawing(args.shapes, args.points, args.noise, args.occlusion, seed=args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "wb") as f:
+        f.write(to_csv(drawing))
+    print(f"Wrote {len(drawing)} rows to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import React, { useState, useRef, useEffect } from "react";
+import React, { useState, useRef } from "react";
 import axios from "axios";
 import { Stage, Layer, Line } from "react-konva";
 import { FaPencilAlt } from "react-icons/fa";
@@ -12,7 +12,6 @@ const DrawingApp = () => {
     const [isLoading, setIsLoading] = useState(false);
     const [inputImageUrl, setInputImageUrl] = useState("");
     const [outputImageUrl, setOutputImageUrl] = useState("");
-    const [refreshTrigger, setRefreshTrigger] = useState(0);
     const lastPosRef = useRef(null);
     const fileInputRef = useRef(null);
 
@@ -52,6 +51,16 @@ const DrawingApp = () => {
         return csvContent;
     };
 
+    // The backend stores each request's images under the id it returns in X-Request-ID
+    const loadImages = async (requestId) => {
+        if (!requestId) return;
+        const { data } = await axios.get(`https://shadow-fd0n.onrender.com/get-image-url`, {
+            params: { request_id: requestId },
+        });
+        setInputImageUrl(data.inputImageUrl);
+        setOutputImageUrl(data.imageUrl);
+    };
+
     const downloadResults = async () => {
         setIsLoading(true);
         const csvData = generateCSVData();
@@ -75,7 +84,7 @@ const DrawingApp = () => {
             document.body.appendChild(a);
             a.click();
             window.URL.revokeObjectURL(url);
-            setRefreshTrigger((prev) => prev + 1);
+            await loadImages(response.headers["x-request-id"]);
         } catch (error) {
             console.error("Error during file download:", error);
         } finally {
@@ -104,7 +113,7 @@ const DrawingApp = () => {
             document.body.appendChild(a);
             a.click();
             window.URL.revokeObjectURL(url);
-            setRefreshTrigger((prev) => prev + 1);
+            await loadImages(response.headers["x-request-id"]);
         } catch (error) {
             console.error("Error during file download:", error);
         } finally {
@@ -112,15 +121,6 @@ const DrawingApp = () => {
         }
     };
 
-    useEffect(() => {
-        setInputImageUrl(
-            `https://firebasestorage.googleapis.com/v0/b/adobe-gensolve.appspot.com/o/images%2Finput_image.png?alt=media&refresh=${refreshTrigger}`
-        );
-        setOutputImageUrl(
-            `https://firebasestorage.googleapis.com/v0/b/adobe-gensolve.appspot.com/o/images%2Foutput_image.png?alt=media&refresh=${refreshTrigger}`
-        );
-    }, [refreshTrigger]);
-
     return (
         <div className={`theme-container ${document.body.classList.contains("dark") ? "dark" : "light"}`} style={{ padding: "20px", minHeight: "100vh" }}>
             {/* <Header /> */}
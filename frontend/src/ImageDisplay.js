@@ -1,20 +1,34 @@
 // ImageDisplay.js
-import React from "react";
+import React, { useEffect, useState } from "react";
+
+// Images are uploaded in the background after the response, so a fresh
+// URL is retried a few times before it is given up on
+const RETRIES = 5;
+const RETRY_DELAY_MS = 1000;
 
 const ImageDisplay = ({ url, title }) => {
+    const [attempt, setAttempt] = useState(0);
+    useEffect(() => setAttempt(0), [url]);
+
+    const retry = () => {
+        if (attempt < RETRIES) setTimeout(() => setAttempt((n) => n + 1), RETRY_DELAY_MS);
+    };
+    const src = url && attempt ? `${url}${url.includes("?") ? "&" : "?"}retry=${attempt}` : url;
+
     return (
         <div style={{ flex: 1, textAlign: "center" }}>
             <h3 style={{ color: "#007bff", marginBottom: "10px" }}>{title}</h3>
-            <img
-                src={url}
+            {url && <img
+                src={src}
                 alt={title}
+                onError={retry}
                 style={{
                     maxWidth: "100%",
                     maxHeight: "550px",
                     borderRadius: "8px",
                     boxShadow: "0 4px 8px rgba(0, 0, 0, 0.3)",
                 }}
-            />
+            />}
         </div>
     );
 };
@@ -1,259 +1,236 @@
-import cv2 as cv
-import numpy as np
-import pandas as pd
-import svgwrite
-from svgpathtools import svg2paths
-import os
-
-def image_to_svg(img, contours_to_draw, circle_info, bounding_box, linesToDraw, filename="output.svg"):
-    try:
-        height, width = img.shape[:2]
-        dwg = svgwrite.Drawing(filename, profile='full', size=(width, height))
-        for contour, color in contours_to_draw:
-            points = contour[:, 0, :].tolist()
-            path_data = f"M {points[0][0]},{points[0][1]} " + " ".join([f"L {p[0]},{p[1]}" for p in points[1:]])
-            path_data += " Z"
-            path = dwg.path(d=path_data, stroke=svgwrite.rgb(*color, '%'), fill="none", stroke_width=1)
-            dwg.add(path)
-        for center, radius in circle_info:
-            dwg.add(dwg.circle(center=center, r=radius, stroke=svgwrite.rgb(0, 0, 255, '%'), fill="none", stroke_width=1))
-        for box in bounding_box:
-            points = box.tolist()
-            for i in range(4):
-                x1, y1 = points[i]
-                x2, y2 = points[(i + 1) % 4]
-                dwg.add(dwg.line((x1, y1), (x2, y2), stroke=svgwrite.rgb(255, 0, 0, '%'), stroke_width=1))
-        for line in linesToDraw:
-            dwg.add(dwg.line((int(a) for a in line[0]), (int(a) for a in line[1]), stroke=svgwrite.rgb(0, 255, 0, '%'), stroke_width=1))
-        dwg.save()
-    except Exception as e:
-        raise RuntimeError(f"Failed to generate SVG file: {str(e)}")
-
-def svg2polylines(svg_path):
-    try:
-        paths, attributes = svg2paths(svg_path)
-        polylines = []
-        for path in paths:
-            polyline = []
-            for segment in path:
-                start_point = segment.start
-                end_point = segment.end
-                polyline.append((start_point.real, start_point.imag))
-                if segment.__class__.__name__ != 'Line':
-                    for t in np.linspace(0, 1, num=100):
-                        point = segment.point(t)
-                        polyline.append((point.real, point.imag))
-                polyline.append((end_point.real, end_point.imag))
-            polylines.append(np.array(polyline))
-        return polylines
-    except Exception as e:
-        raise RuntimeError(f"Failed to convert SVG to polylines: {str(e)}")
-
-def convert_arrays_to_csv(arrays, output_csv_path):
-    try:
-        data = []
-        for idx, arr in enumerate(arrays):
-            for point in arr:
-                data.append([idx, 0, float(point[0]), float(point[1])])
-        df = pd.DataFrame(data)
-        if not os.path.exists("./examples"):
-            os.makedirs("./examples")
-        
-        file_path = os.path.join("./examples", output_csv_path)
-        df.to_csv(file_path, index=False, header=None)
-    except Exception as e:
-        raise RuntimeError(f"Failed to save arrays to CSV: {str(e)}")
-
-def main():
-    path = input("Enter path to CSV file: ").strip()
-    file_name = os.path.basename(path)
-    file_name, _ = os.path.splitext(file_name)
-    if not os.path.isfile(path):
-        raise FileNotFoundError(f"CSV file not found at: {path}")
-    
-    try:
-        polylines = pd.read_csv(path, header=None)
-    except Exception as e:
-        raise RuntimeError(f"Failed to read CSV file: {str(e)}")
-
-    img = np.zeros((512, 512), dtype=np.uint8)
-    current_polyline = None
-
-    for i in range(len(polylines)):
-        if [polylines.iloc[i, 0], polylines.iloc[i, 1]] != current_polyline:
-            current_polyline = [polylines.iloc[i, 0], polylines.iloc[i, 1]]
-        else:
-            pt1 = (int(round(polylines.iloc[i-1, 2])), int(round(polylines.iloc[i-1, 3])))
-            pt2 = (int(round(polylines.iloc[i, 2])), int(round(polylines.iloc[i, 3])))
-            cv.line(img, pt1, pt2, color=255, thickness=1)
-
-    blur = cv.blur(img, (1, 1))
-    _, binary = cv.threshold(blur, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
-    img = cv.cvtColor(img, cv.COLOR_GRAY2RGB)
-    contours, _ = cv.findContours(binary, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
-    shape_info = []
-    
-    for contour in contours:
-        if cv.contourArea(contour) < 3:
-            shape_info.append(("unidentified", contour))
-            continue
-
-        eps = 0.01 * cv.arcLength(contour, True)
-        approx = cv.approxPolyDP(contour, eps, True)
-        shape = "unidentified"
-        peri = cv.arcLength(contour, True)
-        area = cv.contourArea(contour)
-        vertices = len(approx)
-
-        if vertices >= 11:
-            (x, y), radius = cv.minEnclosingCircle(contour)
-            circle_area = np.pi * (radius ** 2)
-            if abs(area - circle_area) < 0.2 * circle_area:
-                center = (int(x), int(y))
-                shape = "circle"
-                shape_info.append((shape, (center, int(radius), contour)))
-                continue
-            circularity = 4 * np.pi * area / (peri ** 2)
-            if 0.43 < circularity < 0.79:
-                shape_info.append(("unidentified", contour))
-                continue
-        else:
-            eps = 0.02 * cv.arcLength(contour, True)
-            approx = cv.approxPolyDP(contour, eps, True)
-            shape = "unidentified"
-            peri = cv.arcLength(contour, True)
-            area = cv.contourArea(contour)
-            vertices = len(approx)
-            if vertices == 3:
-                shape = "triangle"
-            elif vertices == 4:
-                shape = "rectangle"
-            elif vertices == 5:
-                shape = "pentagon"
-            elif vertices == 6:
-                shape = "hexagon"
-            elif vertices == 7:
-                if peri / area > 0.05:
-                    shape_info.append(("unidentified", contour))
-                    continue
-                shape = "heptagon"
-            elif vertices == 8:
-                shape = "octagon"
-            elif vertices == 9:
-                shape = "nonagon"
-            elif vertices == 10:
-                if peri / area > 0.105:
-                    shape_info.append(("unidentified", contour))
-                    continue
-                shape = "decagon"
-        if shape != "unidentified":
-            shape_info.append((shape, (contour, approx)))
-        else:
-            shape_info.append((shape, contour))
-
-    mask = np.ones((512, 512), dtype=np.uint8) * 255
-    circleInfo = []
-    boundingBox = []
-    contoursToDraw = []
-    finalContours = []
-    linesToDraw = []
-
-    for shape, contour in shape_info:
-        if shape == "triangle":
-            cv.drawContours(mask, [contour[0]], -1, 0, 1)
-            contoursToDraw.append((contour[1], (0, 128, 0)))
-        elif shape == "rectangle":
-            rect = cv.minAreaRect(contour[0])
-            box = cv.boxPoints(rect)
-            box = box.astype(int)
-            boundingBox.append(box)
-            cv.drawContours(mask, [contour[0]], -1, 0, 1)
-        elif shape == "pentagon":
-            cv.drawContours(mask, [contour[0]], -1, 0, 1)
-            contoursToDraw.append((contour[1], (128, 0, 128)))
-        elif shape == "hexagon":
-            cv.drawContours(mask, [contour[0]], -1, 0, 1)
-            contoursToDraw.append((contour[1], (0, 128, 128)))
-        elif shape == "heptagon":
-            cv.drawContours(mask, [contour[0]], -1, 0, 1)
-            contoursToDraw.append((contour[1], (255, 165, 0)))
-        elif shape == "octagon":
-            cv.drawContours(mask, [contour[0]], -1, 0, 1)
-            contoursToDraw.append((contour[1], (0, 165, 255)))
-        elif shape == "nonagon":
-            cv.drawContours(mask, [contour[0]], -1, 0, 1)
-            contoursToDraw.append((contour[1], (75, 0, 130)))
-        elif shape == "decagon":
-            cv.drawContours(mask, [contour[0]], -1, 0, 1)
-            contoursToDraw.append((contour[1], (102, 102, 102)))
-        elif shape == "circle":
-            center, radius = contour[0], contour[1]
-            circleInfo.append((center, radius))
-            cv.drawContours(mask, [contour[2]], -1, 0, 1)
-        else:
-            cv.drawContours(img, [contour], -1, (255, 255, 0), 1)
-            finalContours.append((contour, (255, 255, 0)))
-
-    img = cv.bitwise_and(img, img, mask=mask)
-
-    for info in circleInfo:
-        center, radius = info
-        cv.circle(img, center, radius - 5, (0, 0, 255), 1)
-
-        cv.line(img, (center[0] - radius, center[1]), (center[0] + radius, center[1]), (0, 255, 0), 1)
-        cv.line(img, (center[0], center[1] - radius), (center[0], center[1] + radius), (0, 255, 0), 1)
-        linesToDraw.append([(int(center[0] - radius), int(center[1])), (int(center[0] + radius), int(center[1]))])
-        linesToDraw.append([(int(center[0]), int(center[1] - radius)), (int(center[0]), int(center[1] + radius))])
-
-    for box in boundingBox:
-        cv.drawContours(img, [box], 0, (255, 0, 0), 1)
-
-        p1_h = tuple(box[1])
-        p2_h = tuple(box[3])
-        cv.line(img, p1_h, p2_h, (0, 255, 0), 1)
-        linesToDraw.append([p1_h, p2_h])
-        mid1 = tuple(((box[0] + box[1]) // 2).astype(int))
-        mid2 = tuple(((box[1] + box[2]) // 2).astype(int))
-        mid3 = tuple(((box[2] + box[3]) // 2).astype(int))
-        mid4 = tuple(((box[3] + box[0]) // 2).astype(int))
-
-        cv.line(img, mid1, mid3, (0, 255, 0), 1) 
-        cv.line(img, mid2, mid4, (0, 255, 0), 1)
-        linesToDraw.append([mid1, mid3])
-        linesToDraw.append([mid2, mid4])
-
-    for contour in contoursToDraw:
-        cv.drawContours(img, [contour[0]], -1, contour[1], 1)
-        finalContours.append(contour)
-
-        M = cv.moments(contour[0])
-        if M['m00'] != 0:  
-            cx = int(M['m10'] / M['m00'])
-            cy = int(M['m01'] / M['m00'])
-
-            contour_points = np.squeeze(contour[0]).astype(np.float32)
-            mean, eigenvectors = cv.PCACompute(contour_points, mean=np.array([]).astype(np.float32))
-            principal_axis = eigenvectors[0]
-            length = 100  
-            x1 = int(cx - length * principal_axis[0])
-            y1 = int(cy - length * principal_axis[1])
-            x2 = int(cx + length * principal_axis[0])
-            y2 = int(cy + length * principal_axis[1])
-            cv.line(img, (x1, y1), (x2, y2), (0, 255, 0), 1)
-            linesToDraw.append([(x1, y1), (x2, y2)])
-
-    image_to_svg(img, finalContours, circleInfo, boundingBox, linesToDraw)
-
-    try:
-        polylines = svg2polylines("output.svg")
-        convert_arrays_to_csv(polylines, output_csv_path=f"{file_name}_sol.csv")
-        os.remove('output.svg')
-    except Exception as e:
-        raise RuntimeError(f"Failed to process SVG file: {str(e)}")
-
-if __name__ == "__main__":
-    try:
-        main()
-        print("Script executed successfully!")
-    except Exception as e:
-        print(f"Script execution failed: {str(e)}")
+import cv2 as cv
+import numpy as np
+import pandas as pd
+import svgwrite
+import os
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from backend.app.rasterize import fit_canvas, rasterize_polylines
+from backend.app.shapes import ShapeClassifier, SHAPE_COLORS
+from backend.app.polylines import shapes_to_polylines
+from backend.app.ingest import read_polylines
+from backend.app.export import CSV_PRECISION, write_polylines
+from backend.app.symmetry import detect_symmetry
+from backend.app.vector import ENGINES, regularize_polylines
+
+# The CLI only tests circles from 11 vertices up and keeps decagons as polygons.
+shape_classifier = ShapeClassifier(round_vertices=11, ten_vertex_label="decagon")
+
+def image_to_svg(img, contours_to_draw, circle_info, bounding_box, linesToDraw, filename="output.svg"):
+    try:
+        height, width = img.shape[:2]
+        dwg = svgwrite.Drawing(filename, profile='full', size=(width, height))
+        for contour, color in contours_to_draw:
+            points = contour[:, 0, :].tolist()
+            path_data = f"M {points[0][0]},{points[0][1]} " + " ".join([f"L {p[0]},{p[1]}" for p in points[1:]])
+            path_data += " Z"
+            path = dwg.path(d=path_data, stroke=svgwrite.rgb(*color, '%'), fill="none", stroke_width=1)
+            dwg.add(path)
+        for center, radius in circle_info:
+            dwg.add(dwg.circle(center=center, r=radius, stroke=svgwrite.rgb(0, 0, 255, '%'), fill="none", stroke_width=1))
+        for box in bounding_box:
+            points = box.tolist()
+            for i in range(4):
+                x1, y1 = points[i]
+                x2, y2 = points[(i + 1) % 4]
+                dwg.add(dwg.line((x1, y1), (x2, y2), stroke=svgwrite.rgb(255, 0, 0, '%'), stroke_width=1))
+        for line in linesToDraw:
+            dwg.add(dwg.line((int(a) for a in line[0]), (int(a) for a in line[1]), stroke=svgwrite.rgb(0, 255, 0, '%'), stroke_width=1))
+        dwg.save()
+    except Exception as e:
+        raise RuntimeError(f"Failed to generate SVG file: {str(e)}")
+
+def convert_arrays_to_csv(arrays, output_csv_path, output_dir="./examples", precision=CSV_PRECISION, simplify=False):
+    try:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        
+        file_path = os.path.join(output_dir, output_csv_path)
+        write_polylines(file_path, arrays, precision, simplify)
+    except Exception as e:
+        raise RuntimeError(f"Failed to save arrays to CSV: {str(e)}")
+
+def solve_csv(path, svg_path=None, engine="raster"):
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"CSV file not found at: {path}")
+    
+    try:
+        polylines = read_polylines(path)
+    except Exception as e:
+        raise RuntimeError(f"Failed to read CSV file: {str(e)}")
+
+    if engine == "vector":
+        return [polyline for shape in regularize_polylines(polylines) for polyline in shape.polylines()]
+
+    transform = fit_canvas(polylines)
+    img = rasterize_polylines(polylines, transform)
+
+    blur = cv.blur(img, (1, 1))
+    _, binary = cv.threshold(blur, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+    img = cv.cvtColor(img, cv.COLOR_GRAY2RGB)
+    contours, _ = cv.findContours(binary, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+    shapes = shape_classifier.classify(contours)
+
+    mask = np.ones(img.shape[:2], dtype=np.uint8) * 255
+    circleInfo = []
+    boundingBox = []
+    contoursToDraw = []
+    finalContours = []
+    linesToDraw = []
+
+    for shape in shapes:
+        if shape.label == "rectangle":
+            rect = cv.minAreaRect(shape.contour)
+            box = cv.boxPoints(rect)
+            box = box.astype(int)
+            boundingBox.append(box)
+            cv.drawContours(mask, [shape.contour], -1, 0, 1)
+        elif shape.label == "circle":
+            circleInfo.append((shape.center, shape.radius))
+            cv.drawContours(mask, [shape.contour], -1, 0, 1)
+        elif shape.label in SHAPE_COLORS:
+            cv.drawContours(mask, [shape.contour], -1, 0, 1)
+            contoursToDraw.append((shape.approx, SHAPE_COLORS[shape.label]))
+        else:
+            cv.drawContours(img, [shape.contour], -1, (255, 255, 0), 1)
+            finalContours.append((shape.contour, (255, 255, 0)))
+
+    img = cv.bitwise_and(img, img, mask=mask)
+
+    for info in circleInfo:
+        center, radius = info
+        cv.circle(img, center, max(radius - 5, 0), (0, 0, 255), 1)
+
+        cv.line(img, (center[0] - radius, center[1]), (center[0] + radius, center[1]), (0, 255, 0), 1)
+        cv.line(img, (center[0], center[1] - radius), (center[0], center[1] + radius), (0, 255, 0), 1)
+        linesToDraw.append([(int(center[0] - radius), int(center[1])), (int(center[0] + radius), int(center[1]))])
+        linesToDraw.append([(int(center[0]), int(center[1] - radius)), (int(center[0]), int(center[1] + radius))])
+
+    for box in boundingBox:
+        cv.drawContours(img, [box], 0, (255, 0, 0), 1)
+
+        p1_h = tuple(box[1])
+        p2_h = tuple(box[3])
+        cv.line(img, p1_h, p2_h, (0, 255, 0), 1)
+        linesToDraw.append([p1_h, p2_h])
+        mid1 = tuple(((box[0] + box[1]) // 2).astype(int))
+        mid2 = tuple(((box[1] + box[2]) // 2).astype(int))
+        mid3 = tuple(((box[2] + box[3]) // 2).astype(int))
+        mid4 = tuple(((box[3] + box[0]) // 2).astype(int))
+
+        cv.line(img, mid1, mid3, (0, 255, 0), 1) 
+        cv.line(img, mid2, mid4, (0, 255, 0), 1)
+        linesToDraw.append([mid1, mid3])
+        linesToDraw.append([mid2, mid4])
+
+    for contour in contoursToDraw:
+        cv.drawContours(img, [contour[0]], -1, contour[1], 1)
+        finalContours.append(contour)
+
+    for axis in detect_symmetry([contour[0] for contour in contoursToDraw]):
+        p1 = tuple(int(v) for v in np.rint(axis.start))
+        p2 = tuple(int(v) for v in np.rint(axis.end))
+        cv.line(img, p1, p2, (0, 255, 0), 1)
+        linesToDraw.append([p1, p2])
+
+    if svg_path is not None:
+        image_to_svg(img, finalContours, circleInfo, boundingBox, linesToDraw, filename=svg_path)
+
+    polylines = shapes_to_polylines(finalContours, circleInfo, boundingBox, linesToDraw)
+    return [transform.to_drawing(polyline) for polyline in polylines]
+
+def process_file(path, output_dir="./examples", svg=False, precision=CSV_PRECISION, simplify=False, engine="raster"):
+    """
+    Solve one CSV and write <name>_sol.csv (and <name>_sol.svg when svg
+    is set) into output_dir. Every output name derives from the input
+    name, so concurrent runs on different files never share a file.
+    """
+    file_name, _ = os.path.splitext(os.path.basename(path))
+    svg_path = os.path.join(output_dir, f"{file_name}_sol.svg") if svg else None
+    os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    polylines = solve_csv(path, svg_path=svg_path, engine=engine)
+    convert_arrays_to_csv(polylines, output_csv_path=f"{file_name}_sol.csv", output_dir=output_dir,
+                          precision=precision, simplify=simplify)
+    return time.perf_counter() - start, len(polylines)
+
+def collect_inputs(sources):
+    """
+    Expand directories and glob patterns into a sorted list of CSV files.
+    Directories skip existing *_sol.csv outputs so reruns don't solve
+    their own results.
+    """
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            paths.update(p for p in glob.glob(os.path.join(source, "*.csv")) if not p.endswith("_sol.csv"))
+        else:
+            paths.update(glob.glob(source) or [source])
+    return sorted(paths)
+
+def _process_file_safe(path, output_dir, svg, precision, simplify, engine):
+    try:
+        seconds, count = process_file(path, output_dir, svg, precision, simplify, engine)
+        return path, seconds, count, "ok"
+    except Exception as e:
+        return path, float("nan"), 0, f"error: {e}"
+
+def run_batch(sources, output_dir="./examples", workers=None, svg=False, precision=CSV_PRECISION, simplify=False,
+              engine="raster"):
+    paths = collect_inputs(sources)
+    if not paths:
+        raise FileNotFoundError(f"No CSV files matched: {' '.join(sources)}")
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_process_file_safe, paths,
+                                    [output_dir] * len(paths), [svg] * len(paths),
+                                    [precision] * len(paths), [simplify] * len(paths),
+                                    [engine] * len(paths)))
+    elapsed = time.perf_counter() - start
+
+    summary = pd.DataFrame(results, columns=["file", "seconds", "polylines", "status"])
+    summary.to_csv(os.path.join(output_dir, "batch_summary.csv"), index=False)
+
+    for path, seconds, count, status in results:
+        print(f"{os.path.basename(path):<32}{seconds:>9.3f}s{count:>7} polylines  {status}")
+    failed = int((summary["status"] != "ok").sum())
+    print(f"{len(paths)} files, {failed} failed, {elapsed:.2f}s wall with {workers} workers")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regularize polyline CSVs into <name>_sol.csv files.")
+    parser.add_argument("inputs", nargs="*", help="CSV files, directories or glob patterns; prompts for one file when omitted")
+    parser.add_argument("-o", "--output-dir", default="./examples", help="directory for the results (default: ./examples)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--svg", action="store_true", help="also export <name>_sol.svg next to each CSV")
+    parser.add_argument("-p", "--precision", type=int, default=CSV_PRECISION,
+                        help=f"decimals kept in the output, negative for full precision (default: {CSV_PRECISION})")
+    parser.add_argument("--simplify", action="store_true", help="drop repeated and collinear consecutive points")
+    parser.add_argument("--engine", choices=ENGINES, default="raster",
+                        help="fit shapes to image contours (raster) or directly to the input points (vector)")
+    args = parser.parse_args(argv)
+    if args.svg and args.engine != "raster":
+        parser.error("--svg is only available with the raster engine")
+
+    if args.inputs:
+        summary = run_batch(args.inputs, args.output_dir, args.workers, args.svg, args.precision, args.simplify,
+                            args.engine)
+        if (summary["status"] != "ok").any():
+            raise RuntimeError("Some files failed, see batch_summary.csv")
+        return
+
+    path = input("Enter path to CSV file: ").strip()
+    process_file(path, args.output_dir, args.svg, args.precision, args.simplify, args.engine)
+
+if __name__ == "__main__":
+    try:
+        main()
+        print("Script executed successfully!")
+    except Exception as e:
+        print(f"Script execution failed: {str(e)}")